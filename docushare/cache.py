@@ -0,0 +1,164 @@
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class PageCache:
+    '''Cache of the parsed DocuShare pages.
+
+    Each entry is keyed on a string that identifies the page, e.g. its URL, and holds the ETag and Last-Modified values returned by
+    the DocuShare site together with the parsed result, so that the page can be revalidated with a
+    conditional HTTP GET request. All methods of this class are thread-safe.
+
+    Parameters
+    ----------
+    cache_dir : path-like object or None
+        Directory to persist the cache entries. The entries are stored in a :py:mod:`shelve` database
+        in this directory and reused by the later sessions. If None, the entries are kept only in memory.
+    ttl : int or float
+        Time in seconds during which an entry is considered fresh, i.e. it can be used without
+        revalidation with the DocuShare site. If it is 0, entries are never considered fresh.
+    maxsize : int
+        Maximum number of the entries. The least recently used entries are discarded when the number of
+        the entries exceeds this size.
+    '''
+
+    def __init__(self, cache_dir = None, ttl = 0, maxsize = 2048):
+        if not isinstance(ttl, (int, float)) or ttl < 0:
+            raise TypeError('ttl must be a non-negative number')
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise TypeError('maxsize must be a positive integer')
+
+        self.__lock    = threading.Lock()
+        self.__ttl     = ttl
+        self.__maxsize = maxsize
+        self.__entries = OrderedDict() # The key is the key of the page, and the value is a tuple of ETag,
+                                       # Last-Modified, the parsed result and the time when
+                                       # the entry was stored or revalidated. The most recently
+                                       # used entry is at the end.
+        if cache_dir is None:
+            self.__shelf = None
+        else:
+            cache_dir = Path(cache_dir)
+            cache_dir.mkdir(parents = True, exist_ok = True)
+            self.__shelf = shelve.open(str(cache_dir.joinpath('pages')))
+            # Load the entries in the order that they were stored. Discard the entries in an unknown format,
+            # including the ones that were stored by an incompatible version and cannot be unpickled.
+            entries = []
+            for key in list(self.__shelf.keys()):
+                try:
+                    entry = self.__shelf[key]
+                except Exception:
+                    entry = None
+                if isinstance(entry, tuple) and len(entry) == 4:
+                    entries.append((key, entry))
+                else:
+                    del self.__shelf[key]
+            for key, entry in sorted(entries, key = lambda item: item[1][3]):
+                self.__entries[key] = entry
+            self.__evict()
+
+    def get(self, key):
+        '''Get the cache entry of the given key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the DocuShare page.
+
+        Returns
+        -------
+        tuple or None
+            Tuple of ETag, Last-Modified and the parsed result, or None if the key is not cached.
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            self.__entries.move_to_end(key)
+            return entry[:3]
+
+    def is_fresh(self, key):
+        '''Check if the cache entry of the given key can be used without revalidation.
+
+        Parameters
+        ----------
+        key : str
+            Key of the DocuShare page.
+
+        Returns
+        -------
+        bool
+            True if the entry exists and it was stored or revalidated within the time to live.
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            return entry is not None and time.time() - entry[3] < self.__ttl
+
+    def set(self, key, etag, last_modified, parsed):
+        '''Store the parsed result of the given key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the DocuShare page.
+        etag : str or None
+            ETag returned by the DocuShare site.
+        last_modified : str or None
+            Last-Modified returned by the DocuShare site.
+        parsed
+            The parsed result of the page.
+        '''
+        with self.__lock:
+            self.__store(key, (etag, last_modified, parsed, time.time()))
+            self.__evict()
+
+    def refresh(self, key):
+        '''Mark the cache entry of the given key as revalidated now.
+
+        Parameters
+        ----------
+        key : str
+            Key of the DocuShare page.
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__store(key, entry[:3] + (time.time(),))
+
+    def clear(self):
+        '''Discard all cache entries, including the ones persisted on the disk.'''
+        with self.__lock:
+            self.__entries.clear()
+            if self.__shelf is not None:
+                self.__shelf.clear()
+
+    def sync(self):
+        '''Write back the cache entries to the disk if they are persisted.'''
+        with self.__lock:
+            if self.__shelf is not None:
+                self.__shelf.sync()
+
+    def close(self):
+        '''Write back the cache entries to the disk and close the database if they are persisted.
+
+        The cache can still be used after it is closed, but the entries are kept only in memory.
+        '''
+        with self.__lock:
+            if self.__shelf is not None:
+                self.__shelf.close()
+                self.__shelf = None
+
+    def __store(self, key, entry):
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        if self.__shelf is not None:
+            self.__shelf[key] = entry
+
+    def __evict(self):
+        while len(self.__entries) > self.__maxsize:
+            key, _ = self.__entries.popitem(last = False)
+            if self.__shelf is not None:
+                del self.__shelf[key]
@@ -1,25 +1,76 @@
+import functools
 import getpass
 import json
 import logging
+import os
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from importlib import metadata
 from pathlib import Path
 from urllib.parse import urlparse, urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import pyduktape
 
+try:
+    import keyring
+except ImportError:
+    # keyring is optional. It is required only for PasswordOption.USE_STORED.
+    keyring = None
+
+try:
+    from tqdm import tqdm
+    _HAS_TQDM = True
+except ImportError:
+    # tqdm is optional. It is required only to show progress bars.
+    tqdm = None
+    _HAS_TQDM = False
+
+from .cache import PageCache
 from .dsobject import DocumentObject, VersionObject, CollectionObject
 from .handle import Handle, HandleType, handle
 from .parser import (DocuShareParseError,
                      is_not_authorized_page, is_not_found_page,
-                     parse_history_page, parse_if_system_error_page,
+                     parse_history_page_versions, parse_if_system_error_page,
                      parse_login_page, parse_property_page,
-                     parse_collection_page)
+                     parse_collection_page, parse_content_disposition_filename,
+                     response_markup)
 from .util import join_url
 
 
+def _user_agent():
+    '''Returns the User-Agent header value that identifies this package and its version.
+
+    The version is omitted if the package is not installed, e.g. when it is used from a source tree.
+    '''
+    try:
+        product = f'PyDocuShare/{metadata.version("PyDocuShare")}'
+    except metadata.PackageNotFoundError:
+        product = 'PyDocuShare'
+    return f'{product} (+https://tmtsoftware.github.io/pydocushare/)'
+
+
+def _configure_default_logger():
+    '''Default logging settings to output log messages to stdout.
+
+    The handler is added only once even if this module is reloaded.
+    '''
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        log_handler   = logging.StreamHandler() # to output stdout.
+        log_formatter = logging.Formatter('%(asctime)s: %(levelname)s - %(message)s')
+        log_handler.setFormatter(log_formatter)
+        logger.addHandler(log_handler)
+    return logger
+
+_logger = _configure_default_logger()
+
+
 class Resource(Enum):
     '''This enum represents one DocuShare resource.'''
     
@@ -147,14 +198,30 @@ class DocuShare:
     base_url : str
         Base URL of DocuShare. Both 'http' and 'https' schemes are supported.
         For example, https://your.docushare.domain/docushare/.
+    cache_dir : path-like object or None
+        Directory to persist the parsed DocuShare pages so that they are reused by the later sessions
+        after revalidation with the DocuShare site. If None, the parsed pages are cached only in memory.
+        The pages are cached separately for each DocuShare user and never reused for another user.
+    cache_ttl : int or float
+        Time in seconds during which a cached DocuShare page is used without accessing the DocuShare site.
+        If it is 0, the cached pages are always revalidated with the DocuShare site. Note that the changes
+        on the DocuShare site, including the changes of the access permissions, are not seen while the
+        cached page is used. The cached pages of a user are never used for another user.
+    cache_size : int
+        Maximum number of the cached DocuShare pages.
 
     Warnings
     --------
     This class is not thread-safe. Use an appropriate mechanism if you want to use an instance of this class
-    in multiple threads.
+    in multiple threads. Note that :py:meth:`prefetch` internally uses multiple threads in a safe manner.
     '''
     
-    def __init__(self, base_url):        
+    __DOWNLOAD_CHUNK_SIZE = 1024 * 1024 # Size in bytes of each chunk written to a file while downloading.
+    __challenge_js_cache = {} # Dict to cache challenge.js shared by all instances. The key is a tuple of the base URL
+                              # and the URL of challenge.js, and the value is a tuple of its ETag and the JavaScript.
+    __challenge_js_cache_lock = threading.Lock()
+
+    def __init__(self, base_url, cache_dir = None, cache_ttl = 0, cache_size = 2048):
         # Check if the given URL is valid.
         parse_result = urlparse(base_url)
         if parse_result.scheme != 'http' and parse_result.scheme != 'https':
@@ -164,19 +231,64 @@ class DocuShare:
         if not parse_result.path.endswith('/'):
             base_url = base_url + '/'
 
-        # Default logging settings to output log messages to stdout.
-        self.__logger = logging.getLogger(__name__)
-        log_handler   = logging.StreamHandler() # to output stdout.
-        log_formatter = logging.Formatter('%(asctime)s: %(levelname)s - %(message)s')
-        log_handler.setFormatter(log_formatter)
-        self.__logger.addHandler(log_handler)
-
-        self.__base_url = base_url
-        self.__session  = requests.Session()
+        self.__logger = _logger
+
+        self.__base_url        = base_url
+        # base_url always ends with '/'. Therefore, the URLs of the resources are constructed by simple
+        # string concatenation rather than join_url().
+        self.__dsweb_url       = f'{base_url}dsweb/'
+        self.__login_url       = f'{self.__dsweb_url}Login'
+        self.__apply_login_url = f'{self.__dsweb_url}ApplyLogin'
+        self.__resource_urls   = {  # URLs of the resources that do not depend on a handle.
+            Resource.DSWEB     : self.__dsweb_url,
+            Resource.Login     : self.__login_url,
+            Resource.ApplyLogin: self.__apply_login_url,
+        }
+        self.__url_builders    = {  # Methods to build the URLs of the resources specific to a handle.
+            Resource.Services: self.__services_url,
+            Resource.History : self.__history_url,
+            Resource.Get     : self.__get_url,
+            Resource.View    : self.__view_url,
+            Resource.ViewAll : self.__view_all_url,
+        }
+        # Cache the URLs of the resources specific to a handle. The cache size is bounded so that
+        # the memory usage does not grow unlimitedly in a long session.
+        self.__handle_url      = functools.lru_cache(maxsize = 4096)(
+            lambda resource, hdl: self.__url_builders[resource](hdl))
+        self.__session  = self.__create_session()
         self.__username = None
+        self.__dsobjects_lock = threading.Lock()
         self.__dsobjects = {} # Dict to cache the DocuShare object.
                               # The key is an instance of Handle,
                               # and the value is an instance of DocuShareBaseObject.
+        self.__js_context = None # Tuple of challenge.js and the JavaScript context in which it was evaluated.
+        self.__pages = PageCache(cache_dir, ttl = cache_ttl, maxsize = cache_size) # Cache of the parsed DocuShare pages.
+
+    @staticmethod
+    def __create_session():
+        '''Create a new HTTP session with the connection pool and retry settings for DocuShare.
+
+        The connection pool is made larger than the default so that keep-alive connections are not
+        torn down when many objects are accessed. Idempotent requests are retried on transient
+        gateway errors. POST requests are never retried. When the retries are exhausted, the last
+        response is returned so that :py:meth:`requests.Response.raise_for_status` raises
+        :py:class:`requests.HTTPError` rather than :py:class:`requests.exceptions.RetryError`.
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections = 32,
+            pool_maxsize = 32,
+            max_retries = Retry(total = 3, backoff_factor = 0.3, status_forcelist = [502, 503, 504],
+                                raise_on_status = False),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept-Language': 'en-US,en;q=0.9', # Specify English because the parsers expect English pages.
+            'Connection': 'keep-alive',
+            'User-Agent': _user_agent(),
+        })
+        return session
 
     @property
     def logger(self):
@@ -192,7 +304,7 @@ class DocuShare:
         '''
         return self.__logger
 
-    def http_get(self, url):
+    def http_get(self, url, headers = None, stream = False):
         '''Access the given URL with HTTP GET method using the current DocuShare session.
 
         This method may be useful to access the resource that PyDocuShare does not directly support
@@ -202,6 +314,11 @@ class DocuShare:
         ----------
         url : str
             URL to access.
+        headers : dict or None
+            Additional HTTP headers to send.
+        stream : bool
+            If True, the response body is not downloaded until it is accessed. See
+            :py:meth:`requests.Session.request` for more details. It is useful to download a large file.
 
         Returns
         -------
@@ -219,21 +336,25 @@ class DocuShare:
         DocuShareParseError
             If this method fails to parse the DocuShare system error page.
         '''
-        self.__logger.info(f'HTTP GET  {url}')
-        headers = {'Accept-Language': 'en-US,en;q=0.9'} # Specify English.
-        response = self.__session.get(url, headers = headers, stream=True)
-        response.raise_for_status()
-
+        self.__logger.info('HTTP GET  %s', url)
+        response = self.__session.get(url, headers = headers, stream = stream)
         try:
-            error_code, error_message = parse_if_system_error_page(response)
-        except Exception as err:
-            raise DocuShareParseError(self, url, err)
-            
-        if error_code:
-            raise DocuShareSystemError(error_code, error_message, self, url)
+            response.raise_for_status()
+
+            try:
+                error_code, error_message = parse_if_system_error_page(response)
+            except Exception as err:
+                raise DocuShareParseError(self, url, err)
+
+            if error_code:
+                raise DocuShareSystemError(error_code, error_message, self, url)
 
-        if is_not_authorized_page(response):
-            raise DocuShareNotAuthorizedError(self, url)
+            if is_not_authorized_page(response):
+                raise DocuShareNotAuthorizedError(self, url)
+        except BaseException:
+            # The caller never receives the response. Release the connection of the streamed response.
+            response.close()
+            raise
 
         return response
 
@@ -261,7 +382,7 @@ class DocuShare:
         requests.HTTPError
             If HTTP error status code was returned.
         '''
-        self.__logger.info(f'HTTP POST {url}')
+        self.__logger.info('HTTP POST %s', url)
         response = self.__session.post(url, data = data)
         response.raise_for_status()
         return response
@@ -273,49 +394,43 @@ class DocuShare:
         if not isinstance(resource, Resource):
             raise TypeError('resource must be one of Resource enum')
 
-        if resource == Resource.DSWEB:
-            return join_url(self.__base_url, 'dsweb/')
-        elif resource == Resource.Login:
-            return join_url(self.url(Resource.DSWEB), 'Login')
-        elif resource == Resource.ApplyLogin:
-            return join_url(self.url(Resource.DSWEB), 'ApplyLogin')
-        elif resource == Resource.Services:
-            if not isinstance(hdl, Handle):
-                raise TypeError('hdl must be an instance of Handle')
-            return join_url(self.url(Resource.DSWEB), 'Services/', hdl.identifier)
-        elif resource == Resource.History:
-            if not isinstance(hdl, Handle):
-                raise TypeError('hdl must be an instance of Handle')
-            if hdl.type != HandleType.Document:
-                raise ValueError('handle type must be Document')
-            return join_url(self.url(Resource.DSWEB), 'ServicesLib/', hdl.identifier + '/', 'History')
-        elif resource == Resource.Get:
-            if not isinstance(hdl, Handle):
-                raise TypeError('hdl must be an instance of Handle')
-            if hdl.type != HandleType.Document and hdl.type != HandleType.Version:
-                raise ValueError('handle type must be Document or Version')
-            return join_url(self.url(Resource.DSWEB), 'Get/', hdl.identifier)
-        elif resource == Resource.View:
-            if not isinstance(hdl, Handle):
-                raise TypeError('hdl must be an instance of Handle')
-            if hdl.type != HandleType.Collection:
-                raise ValueError('handle type must be Collection')
-            return join_url(self.url(Resource.DSWEB), 'View/', hdl.identifier)
-        elif resource == Resource.ViewAll:
-            if not isinstance(hdl, Handle):
-                raise TypeError('hdl must be an instance of Handle')
-            if hdl.type != HandleType.Collection:
-                raise ValueError('handle type must be Collection')
-            cmd_url = join_url(self.url(Resource.DSWEB), 'ProcessMultipleCommand')
-            params = urlencode({
-                'goRangeButton': 'showAll',
-                'container'    : hdl.identifier,
-                'application'  : 'Paging',
-                'collection'   : hdl.identifier,
-            })
-            return f'{cmd_url}?{params}'
-        else:
-            assert False, 'code must not reach here'
+        if resource in self.__resource_urls:
+            return self.__resource_urls[resource]
+
+        return self.__handle_url(resource, hdl)
+
+    @staticmethod
+    def __check_handle(hdl, *handle_types):
+        if not isinstance(hdl, Handle):
+            raise TypeError('hdl must be an instance of Handle')
+        if handle_types and hdl.type not in handle_types:
+            raise ValueError('handle type must be ' + ' or '.join(handle_type.identifier for handle_type in handle_types))
+
+    def __services_url(self, hdl):
+        self.__check_handle(hdl)
+        return f'{self.__dsweb_url}Services/{hdl.identifier}'
+
+    def __history_url(self, hdl):
+        self.__check_handle(hdl, HandleType.Document)
+        return f'{self.__dsweb_url}ServicesLib/{hdl.identifier}/History'
+
+    def __get_url(self, hdl):
+        self.__check_handle(hdl, HandleType.Document, HandleType.Version)
+        return f'{self.__dsweb_url}Get/{hdl.identifier}'
+
+    def __view_url(self, hdl):
+        self.__check_handle(hdl, HandleType.Collection)
+        return f'{self.__dsweb_url}View/{hdl.identifier}'
+
+    def __view_all_url(self, hdl):
+        self.__check_handle(hdl, HandleType.Collection)
+        params = urlencode({
+            'goRangeButton': 'showAll',
+            'container'    : hdl.identifier,
+            'application'  : 'Paging',
+            'collection'   : hdl.identifier,
+        })
+        return f'{self.__dsweb_url}ProcessMultipleCommand?{params}'
    
     def login(
             self,
@@ -363,40 +478,138 @@ class DocuShare:
         if not isinstance(domain, str):
             raise TypeError('domain must be str')
 
+        if self.__username is not None:
+            # Replacing the current session, possibly with another user. Do not reuse anything that was
+            # loaded with the access rights of the previous session.
+            self.__pages.clear()
+            with self.__dsobjects_lock:
+                self.__dsobjects.clear()
+
         self.cookies.clear()
         self.__username = None
-        
-        if username is None:
-            print(f'\nEnter your username for {self.__base_url}')
-            entered_username = input('Username: ')
-        else:
-            entered_username = username
 
         login_url = self.url(Resource.Login)
 
-        if password == PasswordOption.ASK:
-            print(f'\nEnter password of "{entered_username}" for {login_url}')
-            entered_password = getpass.getpass('Password: ')
-        elif password == PasswordOption.USE_STORED:
-            entered_password = self.__get_password(entered_username)
-            if not entered_password:
-                print(f'\nEnter password of "{entered_username}" for {login_url}')
-                entered_password = getpass.getpass('Password: ')
-        else:
-            entered_password = password
-
-        # Open the DocuShare login page, get the login token and JavaScript for
-        # challenge-response authentication.
+        # Open the DocuShare login page and get the login token and the URL of JavaScript for
+        # challenge-response authentication before prompting the user, so that a failure is reported
+        # before the user enters the credentials and the log messages are not mixed with the prompts.
+        # The login token is reused while retrying so that the login page does not have to be opened
+        # again. Only challenge.js is downloaded in background while the password is being entered for
+        # the first time. It is reused while retrying unless the login page refers to another one.
         #
         # Note that, JSESSIONID is added to the cookies when the login page is
         # opened and it is saved as a part of self.__session.
-        login_token, challenge_js_url = self.__open_and_parse_login_page()
-        challenge_js = self.http_get(challenge_js_url).text
+        with ThreadPoolExecutor(max_workers = 1) as executor:
+            login_token      = None
+            challenge_js_url = None
+            challenge_js     = None
+
+            for remaining_count in range(retry_count - 1, -1, -1):
+                if login_token is None:
+                    login_token, login_page_challenge_js_url = self.__open_and_parse_login_page()
+                    if login_page_challenge_js_url != challenge_js_url:
+                        challenge_js_url = login_page_challenge_js_url
+                        challenge_js     = None
+
+                if username is None:
+                    print(f'\nEnter your username for {self.__base_url}')
+                    entered_username = input('Username: ')
+                else:
+                    entered_username = username
+
+                if challenge_js is None:
+                    challenge_js_future = executor.submit(self.__download_challenge_js, challenge_js_url)
+                if password == PasswordOption.ASK:
+                    print(f'\nEnter password of "{entered_username}" for {login_url}')
+                    entered_password = getpass.getpass('Password: ')
+                elif password == PasswordOption.USE_STORED:
+                    entered_password = self.__get_password(entered_username)
+                    if not entered_password:
+                        print(f'\nEnter password of "{entered_username}" for {login_url}')
+                        entered_password = getpass.getpass('Password: ')
+                else:
+                    entered_password = password
+                if challenge_js is None:
+                    challenge_js = challenge_js_future.result()
+
+                logged_in, login_token = self.__submit_credentials(
+                    username = entered_username,
+                    password = entered_password,
+                    login_token = login_token,
+                    challenge_js = challenge_js,
+                    domain = domain)
+                if logged_in:
+                    break
+
+                # The given password string is never changed. It is no use to retry.
+                if remaining_count == 0 or not isinstance(password, PasswordOption):
+                    raise RuntimeError(f'Failed to login at {login_url}.')
+
+                print(f'\nFailed to login at {login_url}.')
+                if password == PasswordOption.USE_STORED:
+                    # Delete unmatched password from the keyring, so that the
+                    # password is asked in the next attempt.
+                    self.__delete_password(entered_username)
+
+                # If DocuShare did not give a new login token, the login page is opened again
+                # in the next attempt.
+
+        # If successfully logged in, record the username.
+        self.__username = entered_username
+        if password == PasswordOption.USE_STORED:
+            self.__set_password(entered_username, entered_password)
+
+        # The entered password is no longer needed. Remove it from the memory.
+        del entered_password
+
+    def __download_challenge_js(self, challenge_js_url):
+        '''Return JavaScript for challenge-response authentication at the given URL.
+
+        challenge.js is a static file. It is cached for all instances and revalidated with its ETag, so
+        that it is downloaded again only if it is updated on the DocuShare site.
+        '''
+        cache_key = (self.__base_url, challenge_js_url)
+        with self.__challenge_js_cache_lock:
+            etag, challenge_js = self.__challenge_js_cache.get(cache_key, (None, None))
+
+        http_response = self.http_get(challenge_js_url, headers = {'If-None-Match': etag} if etag else None)
+        if challenge_js is not None and http_response.status_code == 304:
+            self.__logger.debug('%s has not been modified. Reusing the cached JavaScript.', challenge_js_url)
+        else:
+            challenge_js = http_response.text
+            etag = http_response.headers.get('ETag')
+            with self.__challenge_js_cache_lock:
+                if etag:
+                    self.__challenge_js_cache[cache_key] = (etag, challenge_js)
+                else:
+                    # It cannot be revalidated. Download it every time.
+                    self.__challenge_js_cache.pop(cache_key, None)
+        self.__logger.debug('challenge_js: %s', challenge_js)
+        return challenge_js
+
+    def __forget_challenge_js(self, challenge_js):
+        '''Remove the given JavaScript from the cache of challenge.js so that it is downloaded again.'''
+        with self.__challenge_js_cache_lock:
+            for cache_key, (_, cached_challenge_js) in list(self.__challenge_js_cache.items()):
+                if cache_key[0] == self.__base_url and cached_challenge_js == challenge_js:
+                    del self.__challenge_js_cache[cache_key]
+
+    def __submit_credentials(self, username, password, login_token, challenge_js, domain):
+        '''Send the credentials to DocuShare.
+
+        Returns
+        -------
+        logged_in : bool
+            True if the authentication was successful.
+        next_login_token : str or None
+            If the authentication failed, the login token in the login page that DocuShare returned
+            so that it can be used in the next attempt. None if the authentication was successful or
+            DocuShare did not return a login page.
+        '''
 
         # Get the challenge response.
-        self.__logger.debug(f'challenge_js: {challenge_js}')
         challenge_response = self.__challenge_response(
-            password = entered_password,
+            password = password,
             login_token = login_token,
             challenge_js = challenge_js,
         )
@@ -406,50 +619,33 @@ class DocuShare:
             'response': challenge_response,
             'login_token': login_token,
             'bookmark': '',
-            'username': entered_username,
+            'username': username,
             'password': '',
             'domain': domain,
             'Login': 'Login'
         }
         
         # Do not log 'response' because it can be a hint to an attacker.
-        self.__logger.debug(f'login_token = {login_token}')
-        self.__logger.debug(f'username    = {entered_username}')
-        self.__logger.debug(f'domain      = {domain}')
-        self.http_post(self.url(Resource.ApplyLogin), data = login_info)
+        self.__logger.debug('login_token = %s', login_token)
+        self.__logger.debug('username    = %s', username)
+        self.__logger.debug('domain      = %s', domain)
+        http_response = self.http_post(self.url(Resource.ApplyLogin), data = login_info)
 
-        self.__logger.debug(f'cookies.keys() = {self.cookies.keys()}')
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug('cookies.keys() = %s', self.cookies.keys())
 
         # If the authentication is successful, 'AmberUser' is added to the
         # cookies.
-        if 'AmberUser' not in self.cookies.keys():
-            if retry_count <= 1:
-                raise RuntimeError(f'Failed to login at {login_url}')
-            elif password == PasswordOption.USE_STORED:
-                # Delete unmatched password from the keyring, and ask the
-                # password again.
-                print(f'\nFailed to login at {login_url}.')
-                self.__delete_password(entered_username)
-                self.login(username = username,
-                           password = PasswordOption.USE_STORED,
-                           retry_count = retry_count - 1,
-                           domain = domain)
-            elif password == PasswordOption.ASK:
-                print(f'\nFailed to login at {login_url}.')
-                self.login(username = username,
-                           password = PasswordOption.ASK,
-                           retry_count = retry_count - 1,
-                           domain = domain )
-            else:
-                raise RuntimeError(f'Failed to login at {login_url}.')
+        if 'AmberUser' in self.cookies:
+            return True, None
 
-        # If successfully logged in, record the username.
-        self.__username = entered_username
-        if password == PasswordOption.USE_STORED:
-            self.__set_password(entered_username, entered_password)
-
-        # The entered password is no longer needed. Remove it from the memory.
-        del entered_password
+        # If the authentication failed, DocuShare shows the login page again with a new login token.
+        try:
+            next_login_token, _ = parse_login_page(response_markup(http_response))
+        except Exception:
+            next_login_token = None
+        self.__logger.debug('next login_token = %s', next_login_token)
+        return False, next_login_token
 
     @property
     def cookies(self):
@@ -461,7 +657,7 @@ class DocuShare:
     @property
     def is_logged_in(self):
         '''bool: indicates if this instance successfully logged in the DocuShare site.'''
-        return 'AmberUser' in self.cookies.keys()
+        return 'AmberUser' in self.cookies
 
     def __check_if_logged_in(self):
         if not self.is_logged_in:
@@ -477,52 +673,76 @@ class DocuShare:
         login_page = self.http_get(login_url)
 
         try:
-            login_token, challenge_js_src = parse_login_page(login_page.text)
+            login_token, challenge_js_src = parse_login_page(response_markup(login_page))
         except Exception as err:
             raise DocuShareParseError(self, login_url, err)
             
         challenge_js_url = join_url(login_url, challenge_js_src)
-        self.__logger.debug(f'login_token = {login_token}')
-        self.__logger.debug(f'challenge_js_src = {challenge_js_src}')
-        self.__logger.debug(f'challenge_js_url = {challenge_js_url}')
-        self.__logger.debug(f'cookies.keys()   = {self.cookies.keys()}')
-        if 'JSESSIONID' not in self.cookies.keys():
+        self.__logger.debug('login_token = %s', login_token)
+        self.__logger.debug('challenge_js_src = %s', challenge_js_src)
+        self.__logger.debug('challenge_js_url = %s', challenge_js_url)
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug('cookies.keys()   = %s', self.cookies.keys())
+        if 'JSESSIONID' not in self.cookies:
             self.__logger.warning('JSESSIONID is missing in the cookies.')
         return login_token, challenge_js_url
 
-    @staticmethod
-    def __challenge_response(password, login_token, challenge_js):
-        js_context = pyduktape.DuktapeContext()
-        js_context.eval_js(challenge_js)
+    def __challenge_response(self, password, login_token, challenge_js):
+        # Evaluating challenge.js is done only once while the same challenge.js is used
+        # (e.g. while retrying the login).
+        if self.__js_context is None or self.__js_context[0] != challenge_js:
+            js_context = pyduktape.DuktapeContext()
+            try:
+                js_context.eval_js(challenge_js)
+            except Exception:
+                # Do not reuse the broken challenge.js in the later logins.
+                self.__forget_challenge_js(challenge_js)
+                raise
+            self.__js_context = (challenge_js, js_context)
+        js_context = self.__js_context[1]
         js_context.set_globals(arg1=password, arg2=login_token)
         response = js_context.eval_js('obscure_string(arg1,arg2);')
+        # Do not keep the password in the cached JavaScript context.
+        js_context.set_globals(arg1=None, arg2=None)
         return response
 
     def __get_password(self, username):
+        if keyring is None:
+            return None
+
         try:
-            import keyring
             password = keyring.get_password(self.__base_url, username)
-            if password:
-                self.__logger.info(f'Found stored password of "{username}" for {self.__base_url}.')
-            return password
-        except:
+        except keyring.errors.KeyringError as err:
+            self.__logger.warning('Failed to get the stored password of "%s" for %s: %s', username, self.__base_url, err)
             return None
 
+        if password:
+            self.__logger.info('Found stored password of "%s" for %s.', username, self.__base_url)
+        return password
+
     def __set_password(self, username, password):
+        if keyring is None:
+            return
+
         try:
-            import keyring
             keyring.set_password(self.__base_url, username, password)
-            self.__logger.info(f'Stored password of "{username}" for {self.__base_url}.')
-        except:
-            pass
+        except keyring.errors.KeyringError as err:
+            self.__logger.warning('Failed to store the password of "%s" for %s: %s', username, self.__base_url, err)
+            return
+
+        self.__logger.info('Stored password of "%s" for %s.', username, self.__base_url)
         
     def __delete_password(self, username):
+        if keyring is None:
+            return
+
         try:
-            import keyring
             keyring.delete_password(self.__base_url, username)
-            self.__logger.info(f'Deleted password of "{username}" for {self.__base_url}.')
-        except:
-            pass
+        except keyring.errors.KeyringError as err:
+            self.__logger.warning('Failed to delete the stored password of "%s" for %s: %s', username, self.__base_url, err)
+            return
+
+        self.__logger.info('Deleted password of "%s" for %s.', username, self.__base_url)
 
     def download(self, hdl, path, size_for_progress_report = 1000000):
         '''Download the given handle (Document or Version) as a file.
@@ -532,11 +752,17 @@ class DocuShare:
         hdl : Handle or str
             DocuShare handle to download as a file or a string that represents a valid DocuShare handle.
         path : path-like object
-            Destination file path.
+            Destination file path. If it is an existing directory, the document is downloaded as a file
+            in the given directory and the file name is determined as suggested by the DocuShare site.
         size_for_progress_report : int
             This method shows a progress bar using `tqdm <https://tqdm.github.io/>` if the file size is
             more than the specified size in bytes.
 
+        Returns
+        -------
+        path-like object
+            Path to the downloaded file.
+
         Raises
         ------
         DocuShareNotFoundError
@@ -549,46 +775,76 @@ class DocuShare:
             hdl = handle(hdl)
 
         path = Path(path)
-        url = self.url(Resource.Get, handle(hdl))
-        http_response = self.http_get(url)
-
-        if is_not_found_page(http_response):
-            raise DocuShareNotFoundError(self, url)
-
-        # Get the file size.
-        file_size = 0
-        if 'Content-Length' in http_response.headers:
-            file_size = int(http_response.headers['Content-Length'])
-            self.__logger.debug(f'Content-Length is {file_size} for {url}.')
-        else:
-            self.__logger.debug(f'Content-Length is missing for {url}.')
+        url = self.url(Resource.Get, hdl)
+        # Close the response in any case so that the connection is returned to the pool.
+        with self.http_get(url, stream = True) as http_response:
+            if is_not_found_page(http_response):
+                raise DocuShareNotFoundError(self, url)
+
+            if path.is_dir():
+                # Use the file name in the response header so that the property page does not have to be loaded.
+                filename = parse_content_disposition_filename(http_response)
+                if not filename:
+                    filename = self.object(hdl).filename
+                path = path.joinpath(filename)
+
+            # Get the file size.
+            file_size = 0
+            if 'Content-Length' in http_response.headers:
+                file_size = int(http_response.headers['Content-Length'])
+                self.__logger.debug('Content-Length is %s for %s.', file_size, url)
+            else:
+                self.__logger.debug('Content-Length is missing for %s.', url)
 
-        self.__logger.info(f'Started downloading: {url} => {path}.')
+            self.__logger.info('Started downloading: %s => %s.', url, path)
             
-        with open(path, 'wb') as output_file:
-            try:
-                from tqdm import tqdm
-                use_tqdm = True
-            except:
-                use_tqdm = False
-               
-            if use_tqdm and file_size >= size_for_progress_report:
-                with tqdm(
-                        desc = hdl.identifier,
-                        total = file_size,
-                        unit = 'B',
-                        unit_scale = True,
-                        unit_divisor = 1000,
-                ) as progress_bar:
-                    for data in http_response.iter_content(chunk_size = 1000):
-                        downloaded_size = output_file.write(data)
-                        progress_bar.update(downloaded_size)
-            else:
-                # If tqdm is not available or the file size is not large,
-                # simply download the file silently.
-                output_file.write(http_response.content)
+            with open(path, 'wb', buffering = self.__DOWNLOAD_CHUNK_SIZE) as output_file:
+                # Reserve the disk space beforehand to avoid the fragmentation of the file if the size is known.
+                # Content-Length is the size of the compressed body if the body is encoded.
+                if file_size > 0 and 'Content-Encoding' not in http_response.headers:
+                    self.__preallocate(output_file, file_size)
+
+                try:
+                    if _HAS_TQDM and file_size >= size_for_progress_report:
+                        # The progress bar counts the decoded bytes, so the total is unknown if the body is encoded.
+                        with tqdm(
+                                desc = hdl.identifier,
+                                total = None if 'Content-Encoding' in http_response.headers else file_size,
+                                unit = 'B',
+                                unit_scale = True,
+                                unit_divisor = 1000,
+                        ) as progress_bar:
+                            for data in http_response.iter_content(chunk_size = self.__DOWNLOAD_CHUNK_SIZE):
+                                output_file.write(data)
+                                progress_bar.update(len(data))
+                    else:
+                        # If tqdm is not available or the file size is not large,
+                        # simply download the file silently. The file is written chunk by chunk
+                        # so that the whole file is not held in memory.
+                        for data in http_response.iter_content(chunk_size = self.__DOWNLOAD_CHUNK_SIZE):
+                            output_file.write(data)
+                except BaseException:
+                    # The file may be already extended to its full size by the preallocation. Cut off the part
+                    # that was not written so that an incomplete file never looks complete.
+                    output_file.truncate()
+                    raise
+
+                # Discard the preallocated space that was not written, if any.
+                output_file.truncate()
+
+        self.__logger.info('Completed downloading: %s => %s.', url, path)
+        return path
 
-        self.__logger.info(f'Completed downloading: {url} => {path}.')
+    @staticmethod
+    def __preallocate(output_file, size):
+        '''Allocate the disk space of the given size for the file if the platform supports it.'''
+        if not hasattr(os, 'posix_fallocate'):
+            return
+        try:
+            os.posix_fallocate(output_file.fileno(), 0, size)
+        except OSError:
+            # Some file systems do not support it. The file is simply extended while writing.
+            pass
 
     def __load_properties(self, hdl):
         '''Open and parse the property page of the given handle and return the properties as dict.
@@ -618,15 +874,10 @@ class DocuShare:
         '''
         hdl = handle(hdl)
         url = self.url(Resource.Services, hdl)
-        http_response = self.http_get(url)
-
-        try:
-            return parse_property_page(http_response.text, hdl.type)
-        except Exception as err:
-            raise DocuShareParseError(self, url, err)
+        return self.__load_page(url, lambda html_text: parse_property_page(html_text, hdl.type))
     
     def __load_history(self, hdl):
-        '''Open and parse the history page of the given Document handle and return the Version handles.
+        '''Open and parse the history page of the given Document handle and return the Versions in it.
 
         Parameters
         ----------
@@ -635,7 +886,8 @@ class DocuShare:
 
         Returns
         -------
-        list : :py:class:`list` of :py:enum:`Handle` instances, each represents a Version handle (e.g. Version-xxxxxx).
+        list : :py:class:`list` of tuples of :py:enum:`Handle` (e.g. Version-xxxxxx) and :py:class:`dict`
+            of the version properties found in the history page.
 
         Raises
         ------
@@ -648,14 +900,72 @@ class DocuShare:
         '''
         hdl = handle(hdl)
         url = self.url(Resource.History, hdl)
-        http_response = self.http_get(url)
+        return self.__load_page(url, parse_history_page_versions)
+
+    def __load_page(self, url, parse):
+        '''Open and parse the given DocuShare page, reusing the previously parsed result if the page has not been changed.
+
+        If the page was parsed before and the DocuShare site returned ETag and/or Last-Modified
+        for it, this method sends a conditional HTTP GET request. The previously parsed result is
+        returned without parsing the page again if the DocuShare site responds with
+        "304 Not Modified". If the page was parsed within the time to live of the cache
+        (`cache_ttl`), the previously parsed result is returned without accessing the DocuShare site.
+
+        Parameters
+        ----------
+        url : str
+            URL of the DocuShare page.
+        parse : callable
+            Function that takes the HTML of the page (str or bytes) and returns the parsed result.
+
+        Returns
+        -------
+            The parsed result returned by `parse`.
+
+        Raises
+        ------
+        DocuShareParseError
+            If `parse` fails to parse the DocuShare page.
+        '''
+        page_key = self.__page_key(url)
+        cached_page = self.__pages.get(page_key)
+        if cached_page and self.__pages.is_fresh(page_key):
+            self.__logger.debug('%s was cached recently. Reusing the parsed result.', url)
+            return cached_page[2]
+
+        # Allow intermediate caches (e.g. proxy servers) to serve a recently fetched page.
+        headers = {'Cache-Control': 'max-age=60'}
+        if cached_page:
+            etag, last_modified, _ = cached_page
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        http_response = self.http_get(url, headers = headers)
+        if cached_page and http_response.status_code == 304:
+            self.__logger.debug('%s has not been modified. Reusing the parsed result.', url)
+            self.__pages.refresh(page_key)
+            return cached_page[2]
 
         try:
-            version_handles = parse_history_page(http_response.text)
+            parsed = parse(response_markup(http_response))
         except Exception as err:
             raise DocuShareParseError(self, url, err)
-            
-        return version_handles
+
+        etag          = http_response.headers.get('ETag')
+        last_modified = http_response.headers.get('Last-Modified')
+        self.__pages.set(page_key, etag, last_modified, parsed)
+
+        return parsed
+
+    def __page_key(self, url):
+        '''Return the key of the given DocuShare page in the page cache.
+
+        The parsed pages depend on the access rights of the user. They are never shared between users.
+        The URL includes the base URL of the DocuShare site.
+        '''
+        return f'{self.__username}\n{url}'
 
     def __load_collection(self, hdl):
         '''Open and parse the Collection page and return the handles of the objects under the Collection.
@@ -680,20 +990,27 @@ class DocuShare:
         '''
         hdl = handle(hdl)
 
-        # Tips: Need to access a normal View/ resource first before obtaining View All
-        #       page of the collection.
-        view_url  = self.url(Resource.View, hdl)
-        view_http_response = self.http_get(view_url)
-        
         view_all_url = self.url(Resource.ViewAll, hdl)
-        view_all_http_response = self.http_get(view_all_url)
-        
-        try:
-            object_handles = parse_collection_page(view_all_http_response.text)
-        except Exception as err:
-            raise DocuShareParseError(self, url, err)
-            
-        return object_handles
+
+        # Tips: Need to access a normal View/ resource first before obtaining View All
+        #       page of the collection. It is not needed if the cached View All page is used.
+        if not self.__pages.is_fresh(self.__page_key(view_all_url)):
+            self.http_get(self.url(Resource.View, hdl))
+
+        return self.__load_page(view_all_url, parse_collection_page)
+
+    @staticmethod
+    def __load_concurrently(*loaders):
+        '''Call the given functions concurrently and return their results in the same order.
+
+        The first function is called in the current thread and the others are called in worker threads,
+        so that the round trips to the DocuShare site overlap. If any of the functions raises an
+        exception, it is propagated after all functions complete.
+        '''
+        with ThreadPoolExecutor(max_workers = len(loaders) - 1) as executor:
+            futures = [executor.submit(loader) for loader in loaders[1:]]
+            first_result = loaders[0]()
+        return [first_result] + [future.result() for future in futures]
 
     def object(self, hdl):
         '''Get an instance that represents a DocuShare object.
@@ -724,30 +1041,32 @@ class DocuShare:
             return self.__dsobjects[hdl]
 
         if hdl.type == HandleType.Collection:
-            properties = self.__load_properties(hdl)
+            # Get properties and objects under this collection concurrently.
+            properties, object_handles = self.__load_concurrently(
+                lambda: self.__load_properties(hdl),
+                lambda: self.__load_collection(hdl),
+            )
             title = properties['Title']
 
-            # Get objects under this collection
-            object_handles = self.__load_collection(hdl)
-
-            self.__dsobjects[hdl] = CollectionObject(
+            dsobject = CollectionObject(
                 docushare = self,
                 hdl = hdl,
                 title = title,
                 object_handles = object_handles
             )
-            return self.__dsobjects[hdl]
         elif hdl.type == HandleType.Document:
-            # Get properties
-            properties = self.__load_properties(hdl)
+            # Get properties and history concurrently.
+            properties, versions = self.__load_concurrently(
+                lambda: self.__load_properties(hdl),
+                lambda: self.__load_history(hdl),
+            )
             title = properties['Title']
             filename = properties['_filename']
             document_control_number = properties.get('Document Control Number', None)
+            version_handles = [version_handle for version_handle, _ in versions]
+            self.__cache_versions(versions)
 
-            # Get history
-            version_handles = self.__load_history(hdl)
-            
-            self.__dsobjects[hdl] = DocumentObject(
+            dsobject = DocumentObject(
                 docushare = self,
                 hdl = hdl,
                 title = title,
@@ -755,7 +1074,6 @@ class DocuShare:
                 document_control_number = document_control_number,
                 version_handles = version_handles
             )
-            return self.__dsobjects[hdl]
         elif hdl.type == HandleType.Version:
             # Get properties
             properties = self.__load_properties(hdl)
@@ -763,25 +1081,138 @@ class DocuShare:
             filename = properties['_filename']
             version_number = properties['Version Number']
             
-            self.__dsobjects[hdl] = VersionObject(
+            dsobject = VersionObject(
                 docushare = self,
                 hdl = hdl,
                 title = title,
                 filename = filename,
                 version_number = version_number
             )
-            return self.__dsobjects[hdl]
         else:
             assert False, 'code must not reach here'
 
+        # Another thread may have loaded the same object in the meantime. Make sure that only one
+        # instance is used for each handle.
+        with self.__dsobjects_lock:
+            return self.__dsobjects.setdefault(hdl, dsobject)
+
+    def __cache_versions(self, versions):
+        '''Cache the Version objects whose properties are all available in the history page.
+
+        This saves loading the property pages of the versions. The other versions are loaded by
+        :py:meth:`object` when they are requested.
+        '''
+        with self.__dsobjects_lock:
+            for version_handle, properties in versions:
+                if version_handle in self.__dsobjects:
+                    continue
+                try:
+                    self.__dsobjects[version_handle] = VersionObject(
+                        docushare = self,
+                        hdl = version_handle,
+                        title = properties['Title'],
+                        filename = properties['_filename'],
+                        version_number = properties['Version Number']
+                    )
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+    def prefetch(self, hdls, max_workers = 8):
+        '''Get instances that represent DocuShare objects, loading the uncached ones concurrently.
+
+        The DocuShare pages of the objects that have not been cached yet are loaded in up to
+        `max_workers` threads so that the round trips to the DocuShare site overlap. The loaded objects
+        are cached and :py:meth:`object` returns them without accessing the DocuShare site again.
+
+        Parameters
+        ----------
+        hdls : iterable
+            DocuShare handles (:py:class:`Handle` or str) for which you want to get the objects.
+        max_workers : int
+            Maximum number of the threads to access the DocuShare site.
+
+        Returns
+        -------
+        list
+            :py:class:`list` of :py:class:`DocuShareBaseObject` in the same order as `hdls`.
+
+        Raises
+        ------
+        DocuShareNotFoundError
+            If one of the given handles does not exist.
+        DocuShareNotAuthorizedError
+            If the user is not authorized to access one of the URLs.
+        DocuShareParseError
+            If this method fails to parse one of DocuShare pages related to the given handles.
+        '''
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise TypeError('max_workers must be a positive integer')
+
+        hdls = [handle(hdl) for hdl in hdls]
+        uncached_hdls = list(dict.fromkeys(hdl for hdl in hdls if hdl not in self.__dsobjects))
+        if len(uncached_hdls) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers = min(max_workers, len(uncached_hdls))) as executor:
+                # list() propagates the first exception raised in the threads.
+                list(executor.map(self.object, uncached_hdls))
+
+        return [self.object(hdl) for hdl in hdls]
+
+    def prefetch_tree(self, hdl, max_workers = 8):
+        '''Load all objects in the collection tree concurrently.
+
+        The collection tree is traversed level by level, and the objects at each level are loaded by
+        :py:meth:`prefetch` so that the round trips to the DocuShare site overlap. This is useful before
+        walking a deep collection tree, e.g. to download all documents under a collection.
+
+        Parameters
+        ----------
+        hdl : Handle or str
+            DocuShare handle of the root of the tree.
+        max_workers : int
+            Maximum number of the threads to access the DocuShare site.
+
+        Returns
+        -------
+        DocuShareBaseObject
+            The object of the given handle.
+
+        Raises
+        ------
+        DocuShareNotFoundError
+            If one of the handles in the tree does not exist.
+        DocuShareNotAuthorizedError
+            If the user is not authorized to access one of the URLs.
+        DocuShareParseError
+            If this method fails to parse one of DocuShare pages in the tree.
+        '''
+        root = self.object(hdl)
+
+        visited_hdls = {root.handle}
+        level = [root]
+        while level:
+            child_hdls = []
+            for dsobject in level:
+                if isinstance(dsobject, CollectionObject):
+                    for child_hdl in dsobject.object_handles:
+                        if child_hdl not in visited_hdls:
+                            visited_hdls.add(child_hdl)
+                            child_hdls.append(child_hdl)
+            level = self.prefetch(child_hdls, max_workers = max_workers)
+
+        return root
+
     def __getitem__(self, hdl):
         return self.object(hdl)
 
     def close(self):
         '''Close the session with the DocuShare site.
 
+        The cache of the parsed DocuShare pages is written back to `cache_dir` and closed. The pages
+        parsed after that are cached only in memory.
+
         You need to run :py:meth:`login` again to access any resources on the DocuShare site again.'''
         self.cookies.clear()
         self.__username = None
         self.__session.close()
-        self.__session = requests.Session()
+        self.__session = self.__create_session()
+        self.__pages.close()
@@ -1,10 +1,63 @@
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from pathlib import Path
 import sys
 
+try:
+    from tqdm import tqdm
+    _HAS_TQDM = True
+except ImportError:
+    # tqdm is optional. It is required only to show progress bars.
+    tqdm = None
+    _HAS_TQDM = False
+
 from .handle import Handle, HandleType, DocumentHandleNode, CollectionHandleNode
 
+_STR_OR_NONE = (str, type(None)) # Types for isinstance() to check optional str arguments.
+
+
+def _unique_download_infos(download_infos):
+    '''Resolve the destination paths shared by more than one download.
+
+    The same Document can appear more than once (e.g. in several sub collections downloaded into one
+    directory), and different Documents can have the same file name. A Document is downloaded only once
+    to each path, and the identifier of the handle is appended to the file name of a Document that would
+    overwrite another Document, e.g. "report (Document-12345).pdf".
+
+    Parameters
+    ----------
+    download_infos : list
+        :py:class:`list` of tuples of the Document handle to download and the destination file path.
+
+    Returns
+    -------
+    list
+        :py:class:`list` of tuples of the Document handle and the destination file path, in which each
+        destination file path appears only once.
+
+    Raises
+    ------
+    FileExistsError
+        If the renamed file path of a Document is also the destination of another Document.
+    '''
+    handles_by_path = {} # The key is the destination path, and the value is a dict used as an ordered set of handles.
+    for doc_hdl, file_path in download_infos:
+        handles_by_path.setdefault(file_path, {})[doc_hdl] = None
+
+    unique_infos = []
+    renamed_paths = set()
+    for file_path, doc_hdls in handles_by_path.items():
+        doc_hdls = iter(doc_hdls)
+        unique_infos.append((next(doc_hdls), file_path))
+        for doc_hdl in doc_hdls:
+            renamed_path = file_path.with_name(f'{file_path.stem} ({doc_hdl.identifier}){file_path.suffix}')
+            if renamed_path in handles_by_path or renamed_path in renamed_paths:
+                raise FileExistsError(f'{doc_hdl} cannot be downloaded because {renamed_path} is the destination of another document.')
+            renamed_paths.add(renamed_path)
+            unique_infos.append((doc_hdl, renamed_path))
+    return unique_infos
+
 
 class DocuShareBaseObject(ABC):
     '''Represents one object in DocuShare.
@@ -16,8 +69,11 @@ class DocuShareBaseObject(ABC):
     hdl : Handle
         The DocuShare handle that represents this object.
     '''
+
+    __slots__ = ('__docushare', '__hdl')
     
     def __init__(self, docushare, hdl):
+        # Imported here to avoid the circular import. It is only a lookup in sys.modules after the first call.
         from .docushare import DocuShare
         if not isinstance(docushare, DocuShare):
             raise TypeError('docushare must be an instance of DocuShare')
@@ -54,6 +110,8 @@ class FileObject(DocuShareBaseObject):
     filename : str
         File name of this file.
     '''
+
+    __slots__ = ('_title', '_filename', '_download_url')
     
     def __init__(self, docushare, hdl, title, filename):        
         super().__init__(docushare, hdl)
@@ -65,6 +123,7 @@ class FileObject(DocuShareBaseObject):
 
         self._title     = title
         self._filename  = filename
+        self._download_url = None
     
     @property
     def title(self):
@@ -82,8 +141,10 @@ class FileObject(DocuShareBaseObject):
     @property
     def download_url(self):
         '''str : URL to download this document.'''
-        from .docushare import Resource
-        return self.docushare.url(Resource.Get, self.handle)
+        if self._download_url is None:
+            from .docushare import Resource
+            self._download_url = self.docushare.url(Resource.Get, self.handle)
+        return self._download_url
 
     def download(self, path = None, size_for_progress_report = 1000000):
         '''Download this document from the DocuShare site to the local storage.
@@ -135,23 +196,27 @@ class DocumentObject(FileObject):
     version_handles : list
         Version handles of this document. :py:class:`list` of :py:class:`Handle` instances.'
     '''
+
+    __slots__ = ('_document_control_number', '_version_handles', '_versions')
     
     def __init__(self, docushare, hdl, title, filename, document_control_number, version_handles):
         super().__init__(docushare, hdl, title, filename)
         
         if hdl.type != HandleType.Document:
             raise ValueError('handle type must be Document')
-        if not isinstance(document_control_number, (str, type(None))):
+        if not isinstance(document_control_number, _STR_OR_NONE):
             raise TypeError('document_control_number must be str or None')
         if not isinstance(version_handles, list):
             raise TypeError('verion_handles must be list')
-        if not all([isinstance(version_handle, Handle) for version_handle in version_handles]):
-            raise TypeError('All elements in verion_handles must be instances of Handle')
-        if not all([hdl.type == HandleType.Version for hdl in version_handles]):
-            raise ValueError('All handle types in verion_handles must be Version')
+        for version_handle in version_handles:
+            if not isinstance(version_handle, Handle):
+                raise TypeError('All elements in verion_handles must be instances of Handle')
+            if version_handle.type != HandleType.Version:
+                raise ValueError('All handle types in verion_handles must be Version')
         
         self._document_control_number = document_control_number
         self._version_handles         = version_handles
+        self._versions                = None
 
     @property
     def document_control_number(self):
@@ -168,8 +233,30 @@ class DocumentObject(FileObject):
 
     @property
     def versions(self):
-        ''':py:class:`list` of :py:class:`VersionObject`: Version objects of this document.'''
-        return [self.docushare[ver_hdl] for ver_hdl in self.version_handles]
+        ''':py:class:`list` of :py:class:`VersionObject`: Version objects of this document.
+
+        The Version objects that have not been loaded yet are loaded concurrently. See
+        :py:meth:`prefetch_versions` for more details.'''
+        if self._versions is None:
+            self._versions = self.prefetch_versions()
+        return self._versions
+
+    def prefetch_versions(self, max_workers = 8):
+        '''Load the Version objects of this document concurrently.
+
+        See :py:meth:`DocuShare.prefetch` for more details.
+
+        Parameters
+        ----------
+        max_workers : int
+            Maximum number of the threads to access the DocuShare site.
+
+        Returns
+        -------
+        list
+            :py:class:`list` of :py:class:`VersionObject`.
+        '''
+        return self.docushare.prefetch(self.version_handles, max_workers = max_workers)
 
 class VersionObject(FileObject):
     '''Represents one Version object in DocuShare.
@@ -187,6 +274,8 @@ class VersionObject(FileObject):
     version_number : int
         Version number of this version.
     '''
+
+    __slots__ = ('_version_number',)
     
     def __init__(self, docushare, hdl, title, filename, version_number):
         super().__init__(docushare, hdl, title, filename)
@@ -226,6 +315,8 @@ class CollectionObject(DocuShareBaseObject):
     object_handles : list
         Handles of the objects under this collection. :py:class:`list` of :py:class:`Handle` instances.'
     '''
+
+    __slots__ = ('_title', '_object_handles', '_object_handle_tree')
     
     def __init__(self, docushare, hdl, title, object_handles):
         super().__init__(docushare, hdl)
@@ -236,11 +327,12 @@ class CollectionObject(DocuShareBaseObject):
             raise TypeError('title must be str')
         if not isinstance(object_handles, list):
             raise TypeError('object_handles must be list')
-        if not all([isinstance(object_handle, Handle) for object_handle in object_handles]):
+        if not all(isinstance(object_handle, Handle) for object_handle in object_handles):
             raise TypeError('All elements in object_handles must be instances of Handle')
         
-        self._title          = title
-        self._object_handles = object_handles
+        self._title              = title
+        self._object_handles     = object_handles
+        self._object_handle_tree = None
 
     @property
     def title(self):
@@ -255,6 +347,23 @@ class CollectionObject(DocuShareBaseObject):
         ''':py:class:`list` of :py:class:`Handle`: Handles of the objects under this collection.'''
         return self._object_handles
 
+    def prefetch(self, max_workers = 8):
+        '''Load the objects under this collection concurrently.
+
+        See :py:meth:`DocuShare.prefetch` for more details.
+
+        Parameters
+        ----------
+        max_workers : int
+            Maximum number of the threads to access the DocuShare site.
+
+        Returns
+        -------
+        list
+            :py:class:`list` of :py:class:`DocuShareBaseObject`.
+        '''
+        return self.docushare.prefetch(self.object_handles, max_workers = max_workers)
+
     @property
     def object_handle_tree(self):
         '''Tree structure under this collection.
@@ -319,24 +428,62 @@ class CollectionObject(DocuShareBaseObject):
         Document-10001    (Title of Document-10001)
         Document-10002    (Title of Document-10002)
         Document-10003    (Title of Document-10003)
+
+        The tree structure is built only once and cached. Call :py:meth:`invalidate_tree` to build
+        it again.
+        '''
+        if self._object_handle_tree is None:
+            self._object_handle_tree = self._build_object_handle_tree()
+        return self._object_handle_tree
+
+    def invalidate_tree(self):
+        '''Discard the cached tree structure under this collection.
+
+        The tree structure is built again when :py:attr:`object_handle_tree` is accessed next time.
         '''
-        children = []
-        for obj_hdl in self._object_handles:
-            if obj_hdl.type == HandleType.Document:
-                children.append(DocumentHandleNode(obj_hdl.number))
-            elif obj_hdl.type == HandleType.Collection:
-                children.append(self.docushare[obj_hdl].object_handle_tree)
+        self._object_handle_tree = None
+
+    def _build_object_handle_tree(self):
+        # Traverse the descendant collections depth-first with an explicit stack rather than recursion.
+        # Each stack entry holds a collection, an iterator of its remaining child handles and the
+        # child nodes built so far. The nodes cannot be shared with the cached tree structures of the
+        # descendant collections because each node can have only one parent. Build new nodes.
+        stack = [(self, iter(self._object_handles), [])]
+        ancestor_hdls = {self.handle}
+        while True:
+            collection, obj_hdls, children = stack[-1]
+            for obj_hdl in obj_hdls:
+                if obj_hdl.type == HandleType.Document:
+                    children.append(DocumentHandleNode(obj_hdl.number))
+                elif obj_hdl.type == HandleType.Collection:
+                    if obj_hdl in ancestor_hdls:
+                        # Skip a collection that contains itself to avoid an infinite loop.
+                        continue
+                    sub_collection = self.docushare[obj_hdl]
+                    ancestor_hdls.add(obj_hdl)
+                    stack.append((sub_collection, iter(sub_collection._object_handles), []))
+                    break
+                else:
+                    assert False, 'code must not reach here'
             else:
-                assert False, 'code must not reach here'
-        root = CollectionHandleNode(self.handle.number, children)
-        return root
+                # All children of this collection were built.
+                stack.pop()
+                ancestor_hdls.discard(collection.handle)
+                node = CollectionHandleNode(collection.handle.number, children)
+                if not stack:
+                    return node
+                stack[-1][2].append(node)
 
     def download(self,
                  destination_path = None,
                  option = CollectionDownloadOption.CHILD_ONLY,
-                 progress_report = True):
+                 progress_report = True,
+                 max_workers = 8):
         '''Downlaod the documents in this Collection.
 
+        The documents are downloaded concurrently in up to `max_workers` threads so that the round
+        trips to the DocuShare site overlap.
+
         Parameters
         ----------
         destination_path : path-like object or None
@@ -346,12 +493,35 @@ class CollectionObject(DocuShareBaseObject):
             See :py:class:`CollectionDownloadOption` for more details.
         progress_report : bool
             Show progress bar using `tqdm <https://tqdm.github.io/>` if it is True.
+        max_workers : int
+            Maximum number of the threads to download the documents. If it is 1, the documents are
+            downloaded one by one and a progress bar is also shown for each large document.
 
         Returns
         -------
         list
             :py:class:`list` of downloaded files as :py:class:`pathlib.Path`.
+
+        Raises
+        ------
+        FileExistsError
+            If the documents are downloaded concurrently and the renamed file of a document (see Notes)
+            is also the destination of another document. It is raised before any document is downloaded.
+
+        Notes
+        -----
+        More than one document may have the same destination, e.g. when the same document is in several
+        sub collections with :py:attr:`CollectionDownloadOption.ALL_IN_ONE_DIR`, or when different
+        documents have the same file name. If `max_workers` is 1, the documents are downloaded in order
+        and the last one is left in the file. Otherwise, each document is downloaded only once to each
+        destination, and the identifier of the handle is appended to the file name of a document that
+        would overwrite another document, e.g. "report (Document-12345).pdf". The returned list
+        includes the renamed files.
         '''
+        if not isinstance(max_workers, int):
+            raise TypeError('max_workers must be int')
+        if max_workers < 1:
+            raise ValueError('max_workers must be a positive integer')
 
         if destination_path is None:
             destination_path = Path.cwd()
@@ -362,54 +532,87 @@ class CollectionObject(DocuShareBaseObject):
             raise NotADirectoryError(f'{destination_path} is not a directory.')            
 
         # List of tuples
-        #   The first element in the tuple is the DocumentObject to download.
-        #   The second element is the destination path.
-        download_infos = []
+        #   The first element in the tuple is the Document handle to download.
+        #   The second element is the destination directory.
+        download_targets = []
         
         if option == CollectionDownloadOption.CHILD_ONLY:
-            for obj_hdl in self.object_handles:
-                if obj_hdl.type == HandleType.Document:
-                    doc_obj   = self.docushare[obj_hdl]
-                    file_path = destination_path.joinpath(doc_obj.filename)
-                    download_infos.append( (doc_obj, file_path) )
+            download_targets = [(obj_hdl, destination_path) for obj_hdl in self.object_handles
+                                if obj_hdl.type is HandleType.Document]
         elif option == CollectionDownloadOption.ALL_IN_ONE_DIR:
-            for obj_hdl in self.object_handle_tree.leaves:
-                doc_obj   = self.docushare[obj_hdl]
-                file_path = destination_path.joinpath(doc_obj.filename)
-                download_infos.append( (doc_obj, file_path) )
+            download_targets = [(obj_hdl, destination_path) for obj_hdl in self.object_handle_tree.leaves]
         elif option == CollectionDownloadOption.ALL or \
              option == CollectionDownloadOption.ALL_WITH_HANDLE_AS_DIRNAME:
-            for doc_hdl in self.object_handle_tree.leaves:
-                file_path = destination_path
-                for col_hdl in doc_hdl.path[1:-1]:
+            # Determine the directory of each collection node once in pre-order rather than joining
+            # the directory names of all ancestors for each document. The nodes are identified by id()
+            # because the same collection may appear in different places of the tree.
+            tree = self.object_handle_tree
+            directories = {id(tree): destination_path}
+            collection_titles = {} # Collection titles looked up in this download, keyed by the handle.
+            col_nodes = [tree]
+            while col_nodes:
+                col_node = col_nodes.pop()
+                for child_node in col_node.children:
+                    if child_node.type != HandleType.Collection:
+                        continue
                     if option == CollectionDownloadOption.ALL_WITH_HANDLE_AS_DIRNAME:
-                        file_path = file_path.joinpath(col_hdl.identifier)
+                        dirname = child_node.identifier
                     else:
-                        col_obj = self.docushare[col_hdl]
-                        file_path = file_path.joinpath(col_obj.title)
-                        
-                doc_obj = self.docushare[doc_hdl]
-                file_path = file_path.joinpath(doc_obj.filename)
-                download_infos.append( (doc_obj, file_path) )
+                        dirname = collection_titles.get(child_node)
+                        if dirname is None:
+                            dirname = collection_titles[child_node] = self.docushare[child_node].title
+                    directories[id(child_node)] = directories[id(col_node)].joinpath(dirname)
+                    col_nodes.append(child_node)
+
+            for doc_hdl in tree.leaves:
+                download_targets.append( (doc_hdl, directories[id(doc_hdl.parent)]) )
+
+        # Load all Document objects at once rather than one by one.
+        doc_objs = self.docushare.prefetch([doc_hdl for doc_hdl, _ in download_targets], max_workers = max_workers)
+
+        # List of tuples
+        #   The first element in the tuple is the Document handle to download.
+        #   The second element is the destination path.
+        download_infos = [(doc_obj.handle, directory.joinpath(doc_obj.filename))
+                          for doc_obj, (_, directory) in zip(doc_objs, download_targets)]
 
         if len(download_infos) == 0:
             return []
                
-        if progress_report:
-            try:
-                from tqdm import tqdm
+        # Create the destination directories beforehand so that the threads do not have to. Each directory
+        # is created only once, and the shallower directories first so that mkdir() does not have to walk
+        # up the parents of the deeper ones.
+        directories = set(file_path.parent for _, file_path in download_infos)
+        for directory in sorted(directories, key = lambda directory: len(directory.parts)):
+            directory.mkdir(parents = True, exist_ok = True)
+
+        if max_workers == 1 or len(download_infos) == 1:
+            if progress_report and _HAS_TQDM:
                 iterator = tqdm(download_infos)
                 size_for_progress_report = 1
-            except:
+            else:
                 iterator = download_infos
                 size_for_progress_report = sys.maxsize
+
+            for doc_hdl, file_path in iterator:
+                self.docushare.download(doc_hdl, file_path, size_for_progress_report = size_for_progress_report)
         else:
-            iterator = download_infos
-            size_for_progress_report = sys.maxsize
-            
-        for doc_obj, file_path in iterator:
-            file_path.parent.mkdir(parents = True, exist_ok = True)
-            self.docushare.download(doc_obj.handle, file_path, size_for_progress_report = size_for_progress_report)
+            # Each destination path must appear only once so that the concurrent downloads never write
+            # the same file.
+            download_infos = _unique_download_infos(download_infos)
+
+            # Progress bars of the individual documents would be mixed up in the concurrent downloads.
+            # Only the progress of the whole downloads is shown.
+            with ThreadPoolExecutor(max_workers = min(max_workers, len(download_infos))) as executor:
+                futures = [executor.submit(self.docushare.download, doc_hdl, file_path,
+                                           size_for_progress_report = sys.maxsize)
+                           for doc_hdl, file_path in download_infos]
+                completed_futures = as_completed(futures)
+                if progress_report and _HAS_TQDM:
+                    completed_futures = tqdm(completed_futures, total = len(futures))
+                for future in completed_futures:
+                    # Propagate the first exception raised in the threads.
+                    future.result()
 
         return [di[1] for di in download_infos]
 
@@ -1,4 +1,4 @@
-import re
+import functools
 from enum import Enum
 
 from anytree import NodeMixin
@@ -16,12 +16,26 @@ def handle(handle_str):
     -------
     Handle
         A canonical instance that represents the given handle.
+
+    Notes
+    -----
+    The instances converted from strings are cached, so that the same instance is returned for the
+    same string. Use ``handle.cache_info()`` and ``handle.cache_clear()`` to inspect and clear the cache.
     '''
-    if isinstance(handle_str, Handle):
+    # Most calls pass a Handle itself. Check the exact type first, which is cheaper than isinstance().
+    if type(handle_str) is Handle or isinstance(handle_str, Handle):
         return handle_str
     
+    return _handle_from_str(handle_str)
+
+@functools.lru_cache(maxsize = 16384)
+def _handle_from_str(handle_str):
+    # Handle instances are immutable. Therefore, the same instance can be returned for the same string.
     return Handle.from_str(handle_str)
 
+handle.cache_info  = _handle_from_str.cache_info
+handle.cache_clear = _handle_from_str.cache_clear
+
 class HandleType(Enum):
     '''Represents a DocuShare handle type.'''
     
@@ -31,6 +45,10 @@ class HandleType(Enum):
 
     def __init__(self, identifier):
         self.__identifier = identifier
+        # Small integer tag to compute the hash of handles, i.e. the index of this member. It is stored in
+        # the member itself rather than a dict keyed by the member, because the hash of Enum members is
+        # computed in Python. The name of this member is added to _member_names_ after __init__().
+        self._tag = len(type(self)._member_names_)
 
     @property
     def identifier(self):
@@ -39,6 +57,9 @@ class HandleType(Enum):
 
     def __str__(self):
         return self.identifier
+
+# Handle types keyed by the string representation to parse handle strings.
+_HANDLE_TYPES_BY_IDENTIFIER = {handle_type.identifier: handle_type for handle_type in HandleType}
   
 class Handle:
     '''This class represents a DocuShare handle.
@@ -58,6 +79,8 @@ class Handle:
         Handle number.
     '''
 
+    __slots__ = ('__handle_type', '__handle_number', '__identifier', '__hash')
+
     def __init__(self, handle_type, handle_number):
         if not isinstance(handle_type, HandleType):
             raise TypeError('handle_type must be one of HandleType enum')
@@ -68,8 +91,24 @@ class Handle:
 
         # TODO: is zero really a valid handle number?
 
+        self.__set_fields(handle_type, handle_number)
+
+    @classmethod
+    def _unchecked(cls, handle_type, handle_number):
+        # Create an instance without validating the arguments. Use it only for the arguments that are
+        # already known to be valid, e.g. the ones parsed by from_str().
+        hdl = object.__new__(cls)
+        hdl.__set_fields(handle_type, handle_number)
+        return hdl
+
+    def __set_fields(self, handle_type, handle_number):
         self.__handle_type   = handle_type
         self.__handle_number = handle_number
+        # Handle instances are immutable. Build the string representation and the hash only once.
+        # The hash is computed from the integers rather than the string so that it is the same in all
+        # processes (str hash is randomized) and can be pickled together.
+        self.__identifier    = f'{handle_type.identifier}-{handle_number}'
+        self.__hash          = (handle_number << 2) | handle_type._tag
        
     @property
     def type(self):
@@ -84,7 +123,7 @@ class Handle:
     @property
     def identifier(self):
         '''str: String representation of this handle like "Document-20202".'''
-        return f'{self.__handle_type.identifier}-{self.__handle_number}'
+        return self.__identifier
 
     @classmethod
     def from_str(cls, handle_str):
@@ -92,7 +131,7 @@ class Handle:
 
         Parameters
         ----------
-        handle_str : str or bytes-like object
+        handle_str : str
            A string that represents a DocuShare handle like 'Document-20202'.
 
         Returns
@@ -102,26 +141,34 @@ class Handle:
 
         Raises
         ------
+        TypeError
+            If the given object is not a string.
         InvalidHandleError
             If the given string is not a valid DocuShare handle.
         '''
-        
-        for handle_type in HandleType:
-            pattern = f'^{handle_type.identifier}-([0-9]+)$'
-            match = re.match(pattern, handle_str)
-            if match:
-                return Handle(handle_type, int(match.group(1)))
+        if not isinstance(handle_str, str):
+            raise TypeError('handle_str must be str')
 
-        raise InvalidHandleError(handle_str)
+        # A handle string is simply '{type}-{number}'. Split it rather than using regular expressions.
+        type_str, separator, number_str = handle_str.partition('-')
+        handle_type = _HANDLE_TYPES_BY_IDENTIFIER.get(type_str)
+        # isdigit() also accepts non-ASCII digits like '²'. Only accept [0-9].
+        if handle_type is None or not separator or not (number_str.isascii() and number_str.isdigit()):
+            raise InvalidHandleError(handle_str)
+
+        return Handle._unchecked(handle_type, int(number_str))
    
     def __str__(self):
-        return self.identifier
+        return self.__identifier
 
     def __eq__(self, obj):
+        # handle() returns the same instance for the same string. Check the identity first.
+        if self is obj:
+            return True
         return isinstance(obj, Handle) and obj.type == self.type and obj.number == self.number
 
     def __hash__(self):
-        return hash(self.identifier)
+        return self.__hash
 
 class HandleNode(Handle, NodeMixin):
     '''This class represents a DocuShare handle in a tree structure.
@@ -137,14 +184,26 @@ class HandleNode(Handle, NodeMixin):
     def __init__(self, handle_type, handle_number):
         super(HandleNode, self).__init__(handle_type, handle_number)
         self._readonly_node = True
+        # The tree structure is read-only. Cache the results of the queries that walk the whole subtree.
+        self._descendants   = None
+        self._leaves        = None
 
     def _pre_attach(self, parent):
         if self._readonly_node:
             raise RuntimeError('It is not allowed to change the handle tree structure.')
+        self.__clear_subtree_caches(parent)
 
     def _pre_detach(self, parent):
         if self._readonly_node:
             raise RuntimeError('It is not allowed to change the handle tree structure.')
+        self.__clear_subtree_caches(parent)
+
+    @staticmethod
+    def __clear_subtree_caches(parent):
+        # The subtrees of the parent and its ancestors change.
+        for node in parent.path:
+            node._descendants = None
+            node._leaves      = None
         
     @property
     def ancestors(self):
@@ -174,7 +233,9 @@ class HandleNode(Handle, NodeMixin):
     @property
     def descendants(self):
         '''All child handles and their child handles.'''
-        return super().descendants
+        if self._descendants is None:
+            self._descendants = super().descendants
+        return self._descendants
 
     @property
     def height(self):
@@ -199,7 +260,9 @@ class HandleNode(Handle, NodeMixin):
     @property
     def leaves(self):
         '''Tuple of all leaf handles excluding Collection handles.'''
-        return tuple([hdl_node for hdl_node in super().leaves if hdl_node.type != HandleType.Collection])
+        if self._leaves is None:
+            self._leaves = tuple(hdl_node for hdl_node in super().leaves if hdl_node.type != HandleType.Collection)
+        return self._leaves
 
     @property
     def parent(self):
@@ -299,9 +362,12 @@ class CollectionHandleNode(HandleNode):
 
         if not isinstance(children, list):
             raise TypeError('children must be list')
-        if not all([isinstance(child, HandleNode) for child in children]):
+        if not all(isinstance(child, HandleNode) for child in children):
             raise TypeError('All elements in children must be an instance of HandleNode.')
 
+        # Attach the children through the public API of anytree so that the hooks run. It is linear in the
+        # number of children because anytree >= 2.10.0 checks the consistency of the tree only when
+        # ANYTREE_ASSERTIONS is enabled.
         for child in children:
             child._readonly_node = False
             child.parent = self
@@ -1,12 +1,35 @@
 import re
 from pathlib import PurePosixPath
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .handle import HandleType, handle
 from .util import join_url
 
+# Use lxml parser if available because it is much faster than Python's built-in HTML parser.
+try:
+    import lxml
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    _HTML_PARSER = 'html.parser'
+
+_CHALLENGE_JS_RE      = re.compile(r'challenge\.js')
+_VERSION_HANDLE_RE    = re.compile(r'/(Version-[0-9]+)/')
+_DOCUMENT_HANDLE_RE   = re.compile(r'/(Document-[0-9]+)')
+_COLLECTION_HANDLE_RE = re.compile(r'/(Collection-[0-9]+)')
+_FILENAME_EXT_RE      = re.compile(r'filename\*\s*=\s*([^\']*)\'[^\']*\'([^;\s]+)', re.IGNORECASE)
+_FILENAME_RE          = re.compile(r'filename\s*=\s*(?:"([^"]*)"|([^;\s]+))', re.IGNORECASE)
+
+_PROPERTY_CONVERTERS = {'Handle': handle, 'Version Number': int} # Converters of the property values by name.
+
+_COLLECTION_TABLE_STRAINER = SoupStrainer('table', {'class': 'table-collection'})
+_PROPSTABLE_STRAINER       = SoupStrainer('table', {'class': 'propstable'})
+_HISTORY_TABLE_STRAINER    = SoupStrainer('table', {'class': 'table_properties'})
+_INPUT_STRAINER            = SoupStrainer('input')
+_H1_STRAINER               = SoupStrainer('h1')
+_H2_STRAINER               = SoupStrainer('h2')
+
 
 class DocuShareParseError(RuntimeError):
     '''Raised if parsing one of DocuShare web page fails.
@@ -36,6 +59,34 @@ class DocuShareParseError(RuntimeError):
         '''str: DocuShare username who accessed the URL.'''
         return self.__username
 
+def response_markup(http_response):
+    '''Return the HTML of the given HTTP response to pass to the parsers.
+
+    If the charset is specified in Content-Type header, the body is simply decoded with it. Otherwise,
+    the raw bytes are returned so that the HTML parser determines the encoding from the HTML itself
+    (e.g. <meta charset="...">) rather than :py:attr:`requests.Response.text` guessing it by scanning
+    the whole body.
+
+    Parameters
+    ----------
+    http_response : requests.Response
+        HTTP response from a DocuShare site.
+
+    Returns
+    -------
+    str or bytes
+        HTML text, or undecoded HTML bytes if the charset is not specified.
+    '''
+    content_type = http_response.headers.get('Content-Type', '')
+    if 'charset=' in content_type.lower():
+        return http_response.content.decode(http_response.encoding, errors = 'replace')
+    return http_response.content
+
+def _is_html(http_response):
+    # Look up Content-Type header only once. The header dict of requests is case-insensitive and
+    # each lookup lowercases the key.
+    return http_response.headers.get('Content-Type', '').startswith('text/html')
+
 def is_not_found_page(http_response):
     '''Check if the given HTTP response represents 'Not Found' error.
 
@@ -51,11 +102,14 @@ def is_not_found_page(http_response):
     -------
     bool : True if the given HTTP response indicates 'Not Found'.
     '''
-    if not ('Content-Type' in http_response.headers and
-            http_response.headers['Content-Type'].startswith('text/html')):
+    if not _is_html(http_response):
+        return False
+
+    # Most pages do not contain 'Not Found' at all. Avoid parsing them.
+    if b'Not Found' not in http_response.content:
         return False
 
-    soup = BeautifulSoup(http_response.text, 'html.parser')
+    soup = BeautifulSoup(response_markup(http_response), _HTML_PARSER, parse_only = _H2_STRAINER)
     for h2 in soup.find_all('h2'):
         if 'Not Found' in h2.text.strip():
             return True
@@ -76,11 +130,14 @@ def is_not_authorized_page(http_response):
     -------
     bool : True if the given HTTP response indicates 'Not Authorized'.
     '''
-    if not ('Content-Type' in http_response.headers and
-            http_response.headers['Content-Type'].startswith('text/html')):
+    if not _is_html(http_response):
         return False
 
-    soup = BeautifulSoup(http_response.text, 'html.parser')
+    # Most pages do not contain 'Not Authorized' at all. Avoid parsing them.
+    if b'Not Authorized' not in http_response.content:
+        return False
+
+    soup = BeautifulSoup(response_markup(http_response), _HTML_PARSER, parse_only = _H1_STRAINER)
     for h1 in soup.find_all('h1'):
         if 'Not Authorized' in h1.text.strip():
             return True
@@ -101,28 +158,67 @@ def parse_if_system_error_page(http_response):
     error_message : :py:class:`str` or None
         Error message from DocuShare, or None if the given page is not a DocuShare system error page.
     '''
-    if not ('Content-Type' in http_response.headers and
-            http_response.headers['Content-Type'].startswith('text/html')):
+    if not _is_html(http_response):
+        return None, None
+
+    # Most pages are not system error pages. Avoid parsing them.
+    content = http_response.content
+    if b'dserrorcode' not in content and b'detail_message' not in content:
         return None, None
 
-    soup = BeautifulSoup(http_response.text, 'html.parser')
+    soup = BeautifulSoup(response_markup(http_response), _HTML_PARSER, parse_only = _INPUT_STRAINER)
     error_code_tag    = soup.find('input', {'name': 'dserrorcode'})
     error_message_tag = soup.find('input', {'name': 'detail_message'})
 
     if error_code_tag or error_message_tag:
-        error_code    = error_code_tag['value']    if error_code_tag.has_attr('value')    else ''
-        error_message = error_message_tag['value'] if error_message_tag.has_attr('value') else ''
+        # Either of them may be missing.
+        error_code    = error_code_tag.get('value', '')    if error_code_tag    else ''
+        error_message = error_message_tag.get('value', '') if error_message_tag else ''
         return error_code, error_message
     else:
         return None, None
 
+def parse_content_disposition_filename(http_response):
+    '''Get the file name suggested by Content-Disposition header of the given HTTP response.
+
+    Parameters
+    ----------
+    http_response : requests.Response
+        HTTP response from a DocuShare site.
+
+    Returns
+    -------
+    :py:class:`str` or None
+        The suggested file name, or None if Content-Disposition header does not suggest any file name.
+    '''
+    content_disposition = http_response.headers.get('Content-Disposition')
+    if not content_disposition:
+        return None
+
+    # filename*=charset'lang'percent-encoded-name (RFC 6266) takes precedence over filename=.
+    filename_match = _FILENAME_EXT_RE.search(content_disposition)
+    if filename_match:
+        filename = unquote(filename_match.group(2), encoding = filename_match.group(1) or 'utf-8', errors = 'replace')
+    else:
+        filename_match = _FILENAME_RE.search(content_disposition)
+        if not filename_match:
+            return None
+        filename = filename_match.group(1) if filename_match.group(1) is not None else filename_match.group(2)
+
+    # Never allow the server to point outside of the destination directory. The name of a path is
+    # '..' if it ends with '..'.
+    filename = PurePosixPath(filename.replace('\\', '/')).name
+    if not filename or filename == '..':
+        return None
+    return filename
+
 def parse_login_page(html_text):
     '''Parse the DocuShare login page and returns login token and path to challenge.js.
 
     Parameters
     ----------
-    html_text : :py:class:`str`
-        HTML text that was obtained from a DocuShare login page like
+    html_text : :py:class:`str` or :py:class:`bytes`
+        HTML text (or undecoded HTML bytes) that was obtained from a DocuShare login page like
         https://your.docushare.domain/docushare/dsweb/Login.
 
     Returns
@@ -137,7 +233,7 @@ def parse_login_page(html_text):
     RuntimeError
         If the given page cannot be parsed correctly.
     '''
-    soup = BeautifulSoup(html_text, 'html.parser')
+    soup = BeautifulSoup(html_text, _HTML_PARSER)
         
     login_token_element = soup.find('input', {'name': 'login_token'})
     if not login_token_element:
@@ -150,7 +246,7 @@ def parse_login_page(html_text):
     if not login_token:
         raise RuntimeError(f'login_token is empty.')
         
-    challenge_js_script_tag = soup.find('script', src=re.compile('challenge\.js'))
+    challenge_js_script_tag = soup.find('script', src=_CHALLENGE_JS_RE)
     if (not challenge_js_script_tag) or (not challenge_js_script_tag.has_attr('src')):
         raise RuntimeError(f'Cannot find URL of challenge.js.')
 
@@ -163,8 +259,8 @@ def parse_property_page(html_text, handle_type):
 
     Parameters
     ----------
-    html_text : str
-        HTML text that was obtained from a DocuShare property page like
+    html_text : str or bytes
+        HTML text (or undecoded HTML bytes) that was obtained from a DocuShare property page like
         https://your.docushare.domain/docushare/dsweb/Services/Collection-xxxxx,
         https://your.docushare.domain/docushare/dsweb/Services/Document-xxxxx or
         https://your.docushare.domain/docushare/dsweb/Services/Version-xxxxxx.
@@ -180,11 +276,15 @@ def parse_property_page(html_text, handle_type):
     '''
 
     properties = {}
+    need_filename = handle_type == HandleType.Document or handle_type == HandleType.Version
         
-    soup = BeautifulSoup(html_text, 'html.parser')
+    # Build the tree only for the property table. The rest of the page is skipped.
+    soup = BeautifulSoup(html_text, _HTML_PARSER, parse_only = _PROPSTABLE_STRAINER)
     propstable = soup.find('table', {'class': 'propstable'})
+    get_converter = _PROPERTY_CONVERTERS.get # Local binding for the row loop.
     for row in propstable.find_all('tr'):
-        cols = row.find_all('td')
+        # Only the field name and value cells are needed.
+        cols = row.find_all('td', limit = 2)
         if len(cols) < 2:
             continue
         
@@ -194,16 +294,11 @@ def parse_property_page(html_text, handle_type):
 
         field_value = cols[1].text.strip()
 
-        if field_name == 'Handle':
-            properties[field_name] = handle(field_value)
-        elif field_name == 'Version Number':
-            properties[field_name] = int(field_value)
-        else:
-            # TODO: parse user name, date and size
-            properties[field_name] = field_value
+        # TODO: parse user name, date and size
+        converter = get_converter(field_name)
+        properties[field_name] = converter(field_value) if converter else field_value
 
-        if (handle_type == HandleType.Document or handle_type == HandleType.Version) and \
-           field_name == 'Title':
+        if need_filename and field_name == 'Title':
             file_url = cols[1].find('a')['href']
             filename = PurePosixPath(urlparse(file_url).path).name
             properties['_filename'] = filename
@@ -215,8 +310,8 @@ def parse_history_page(html_text):
 
     Parameters
     ----------
-    html_text : str
-        HTML text that was obtained from a DocuShare history page like
+    html_text : str or bytes
+        HTML text (or undecoded HTML bytes) that was obtained from a DocuShare history page like
         https://your.docushare.domain/docushare/dsweb/ServicesLib/Document-xxxxx/History
 
     Returns
@@ -229,52 +324,93 @@ def parse_history_page(html_text):
     This method may return an empty array if there is only one version in the history.
     '''
 
-    soup = BeautifulSoup(html_text, 'html.parser')
+    return [version_handle for version_handle, _ in parse_history_page_versions(html_text)]
+
+def parse_history_page_versions(html_text):
+    '''Parse a DocuShare history page and returns the version handles with their properties.
+
+    Parameters
+    ----------
+    html_text : str or bytes
+        HTML text (or undecoded HTML bytes) that was obtained from a DocuShare history page like
+        https://your.docushare.domain/docushare/dsweb/ServicesLib/Document-xxxxx/History
+
+    Returns
+    -------
+    list
+        :py:class:`list` of tuples of :py:class:`Handle` and :py:class:`dict`. The dict contains
+        the properties of the version that were found in the history page, i.e. 'Version Number',
+        'Title' and '_filename'. Some of them may be missing depending on the columns in the page.
+
+    Notes
+    -----
+    This method may return an empty array if there is only one version in the history.
+    '''
+
+    # Build the tree only for the history table. The rest of the page is skipped.
+    soup = BeautifulSoup(html_text, _HTML_PARSER, parse_only = _HISTORY_TABLE_STRAINER)
     propstable = soup.find('table', {'class': 'table_properties'})
 
+    # '#' column is used to get the version handles and numbers, and 'Title' column is used to get
+    # the titles and file names. Find their indices once.
+    # TODO: parse the radio button in 'Preferred' column and find the preferred version
     header_columns = propstable.find('thead').find_all('th')
-    field_names = {}
-    for column_index in range(len(header_columns)):
-        field_name = header_columns[column_index].text.strip()
-        if field_name:
-            field_names[column_index] = field_name
+    number_column_index = None
+    title_column_index = None
+    for column_index, header_column in enumerate(header_columns):
+        header_text = header_column.text.strip()
+        if header_text == '#' and number_column_index is None:
+            number_column_index = column_index
+        elif header_text == 'Title' and title_column_index is None:
+            title_column_index = column_index
+    if number_column_index is None:
+        return []
+
+    last_column_index = max(number_column_index, title_column_index or 0)
 
-    version_handles = []
+    # Local bindings for the row loop.
+    search_version_handle = _VERSION_HANDLE_RE.search
+    versions = []
+    append_version = versions.append
     for row in propstable.find_all('tr'):
-        cells = row.find_all('td')
-
-        for column_index in field_names.keys():
-            field_name = field_names[column_index]
-
-            if len(cells) > column_index:
-                if field_name == 'Preferred':
-                    # TODO: parse the radio button and find the preferred version
-                    pass
-                elif field_name == '#':
-                    a_tag = cells[column_index].find('a')
-                    if a_tag:
-                        file_url = a_tag['href']
-                        version_handle_match = re.search(r'\/(Version-[0-9]+)\/', file_url)
-                        if version_handle_match:
-                            handle_str = version_handle_match.group(1)
-                            version_handles.append(handle(handle_str))
-                        else:
-                            # TODO: Support v_Document handle. If there is only one version in the document,
-                            #       the handle is not Version-xxxxxx, but rather v_Document-zzzzz.
-                            pass
-                else:
-                    # Ignore other information
-                    pass
-
-    return version_handles
+        cells = row.find_all('td', limit = last_column_index + 1)
+        if len(cells) <= number_column_index:
+            continue
+
+        a_tag = cells[number_column_index].find('a', href = True)
+        if not a_tag:
+            continue
+
+        version_handle_match = search_version_handle(a_tag['href'])
+        if not version_handle_match:
+            # TODO: Support v_Document handle. If there is only one version in the document,
+            #       the handle is not Version-xxxxxx, but rather v_Document-zzzzz.
+            continue
+
+        properties = {}
+        version_number = a_tag.text.strip()
+        if version_number.isdigit():
+            properties['Version Number'] = int(version_number)
+        if title_column_index is not None and len(cells) > title_column_index:
+            title_cell = cells[title_column_index]
+            properties['Title'] = title_cell.text.strip()
+            title_a_tag = title_cell.find('a')
+            if title_a_tag and title_a_tag.has_attr('href'):
+                filename = PurePosixPath(urlparse(title_a_tag['href']).path).name
+                if filename:
+                    properties['_filename'] = filename
+
+        append_version((handle(version_handle_match.group(1)), properties))
+
+    return versions
 
 def parse_collection_page(html_text):
     '''Parse a DocuShare Collection page and returns the handles of the objects under the Collection.
 
     Parameters
     ----------
-    html_text : str
-        HTML text that was obtained from a DocuShare Collection page like
+    html_text : str or bytes
+        HTML text (or undecoded HTML bytes) that was obtained from a DocuShare Collection page like
         https://your.docushare.domain/docushare/dsweb/View/Collection-xxxxx
 
     Returns
@@ -283,7 +419,8 @@ def parse_collection_page(html_text):
         :py:class:`list` of :py:class:`Handle` instances.
     '''
 
-    soup = BeautifulSoup(html_text, 'html.parser')
+    # Build the tree only for the collection table. The rest of the page is skipped.
+    soup = BeautifulSoup(html_text, _HTML_PARSER, parse_only = _COLLECTION_TABLE_STRAINER)
     collection_table = soup.find('table', {'class': 'table-collection'})
     if not collection_table:
         return []
@@ -291,8 +428,8 @@ def parse_collection_page(html_text):
     object_handles = []
     for row in collection_table.find_all('tr'):
         if row.has_attr('about'):
-            document_handle_match   = re.search(r'\/(Document-[0-9]+)', row['about'])
-            collection_handle_match = re.search(r'\/(Collection-[0-9]+)', row['about'])
+            document_handle_match   = _DOCUMENT_HANDLE_RE.search(row['about'])
+            collection_handle_match = _COLLECTION_HANDLE_RE.search(row['about'])
             if document_handle_match:
                 handle_str = document_handle_match.group(1)
                 object_handles.append(handle(handle_str))
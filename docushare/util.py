@@ -1,6 +1,12 @@
+from functools import lru_cache, reduce
 from urllib.parse import urljoin
 
 
+@lru_cache(maxsize = 4096)
+def _urljoin(base, url):
+    # The same base URLs are joined with the same paths repeatedly while browsing a DocuShare site.
+    return urljoin(base, url)
+
 def join_url(*args):
     '''Construct a full URL by combining a base URL with other URLs.
 
@@ -17,10 +23,6 @@ def join_url(*args):
     'https://www.example.com/another_dir/filename.bin'
     '''
     
-    ret = None
-    for arg in args:
-        if ret is None:
-            ret = arg
-        else:
-            ret = urljoin(ret, arg)
-    return ret
+    if not args:
+        return None
+    return reduce(_urljoin, args)
@@ -38,11 +38,12 @@ setup(
         'beautifulsoup4 >= 4.8.2',
         'requests >= 2.22.0',
         'pyduktape >= 0.0.6',
-        'anytree >= 2.8.0',
+        'anytree >= 2.10.0',
     ],
     extras_require = {
         'password-store': ['keyring >= 18.0.1'],
         'progress-bar': ['tqdm >= 4.30.0'],
+        'fast-parser': ['lxml >= 4.5.0'],
     },
     classifiers=[
         'Topic :: Utilities'
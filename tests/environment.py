@@ -0,0 +1,126 @@
+'''Connection information of the DocuShare site used by the unit tests.
+
+See "Unit Test" section in README.md for the environmental variables.
+'''
+
+import atexit
+import functools
+import os
+import pathlib
+import tempfile
+import types
+from unittest import SkipTest, TestCase
+
+from docushare import DocuShare, PasswordOption
+
+# Environmental variables and the attribute names of DocuShareTestCase to hold their values.
+_ENV_ATTRIBUTES = {
+    'DOCUSHARE_BASEURL'                       : 'base_url',
+    'DOCUSHARE_USERNAME'                      : 'username',
+    'DOCUSHARE_PASSWORD'                      : None,
+    'DOCUSHARE_VALID_DOCUMENT_HANDLE'         : 'valid_document_handle',
+    'DOCUSHARE_VALID_VERSION_HANDLE'          : 'valid_version_handle',
+    'DOCUSHARE_NOT_AUTHORIZED_DOCUMENT_HANDLE': 'not_authorized_document_handle',
+    'DOCUSHARE_NOT_AUTHORIZED_VERSION_HANDLE' : 'not_authorized_version_handle',
+}
+
+@functools.lru_cache(maxsize = 1)
+def envs():
+    '''Read the environmental variables for the unit tests once.
+
+    Returns
+    -------
+    types.MappingProxyType
+        Read-only mapping of the defined environmental variables.
+    '''
+    return types.MappingProxyType({name: os.environ[name] for name in _ENV_ATTRIBUTES if name in os.environ})
+
+def skip_condition(required_envs):
+    '''Check if the test cases that require the given environmental variables need to be skipped.
+
+    Parameters
+    ----------
+    required_envs : tuple or list
+        Names of the required environmental variables.
+
+    Returns
+    -------
+    skip : bool
+        True if any of the required environmental variables is not defined.
+    skip_reason : str
+        Message that lists the environmental variables that are not defined, or an empty string if
+        all of them are defined.
+    '''
+    missing_envs = [env for env in required_envs if env not in envs()]
+    if not missing_envs:
+        return False, ''
+    return True, 'Following environmental variables are not defined: ' + ', '.join(missing_envs)
+
+@functools.lru_cache(maxsize = 1)
+def temp_root():
+    '''Return the directory to create the temporary directories of the unit tests in.
+
+    Returns
+    -------
+    str or None
+        /dev/shm if it is available so that the downloaded files are kept in memory, or None to use
+        the default temporary directory.
+    '''
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+def password():
+    '''Return DOCUSHARE_PASSWORD if defined, or :py:attr:`PasswordOption.USE_STORED` otherwise.'''
+    return envs().get('DOCUSHARE_PASSWORD', PasswordOption.USE_STORED)
+
+@functools.lru_cache(maxsize = 1)
+def logged_in_docushare():
+    '''Return the DocuShare instance shared by all test cases.
+
+    It is logged in at the first call so that the whole test run logs in only once, and it is
+    closed at exit.
+
+    Returns
+    -------
+    DocuShare
+        DocuShare instance logged in as DOCUSHARE_USERNAME.
+    '''
+    ds = DocuShare(envs()['DOCUSHARE_BASEURL'])
+    ds.login(username = envs()['DOCUSHARE_USERNAME'], password = password())
+    atexit.register(ds.close)
+    return ds
+
+class DocuShareTestCase(TestCase):
+    '''Base class of the test cases that share one logged-in DocuShare session.
+
+    Subclasses list the environmental variables that they need in ``required_envs``. All test
+    cases of the class are skipped if any of them is not defined. Otherwise, the value of each required environmental variable is available
+    as a class attribute like ``base_url`` or ``valid_document_handle``. ``ds`` is the DocuShare
+    instance returned by :py:func:`logged_in_docushare`, and ``tempdir`` is a temporary directory
+    for each test.
+    '''
+
+    required_envs = (
+        'DOCUSHARE_BASEURL',
+        'DOCUSHARE_USERNAME',
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        # Skip the whole class before logging in.
+        skip, skip_reason = skip_condition(cls.required_envs)
+        if skip:
+            raise SkipTest(skip_reason)
+
+        for env in cls.required_envs:
+            setattr(cls, _ENV_ATTRIBUTES[env], envs()[env])
+        cls.password = password()
+
+        cls.ds = logged_in_docushare()
+
+    def setUp(self):
+        # Registered as a cleanup so that the directory is removed even if setUp() of a subclass fails.
+        temporary_directory = tempfile.TemporaryDirectory(dir = temp_root())
+        self.addCleanup(temporary_directory.cleanup)
+        self.tempdir = pathlib.Path(temporary_directory.name)
@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import requests
+
+from docushare import *
+from docushare.cache import PageCache
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_in_memory(self):
+        cache = PageCache()
+        self.assertIsNone(cache.get('https://example.org/docushare/dsweb/Services/Document-1'))
+        cache.set('https://example.org/docushare/dsweb/Services/Document-1', '"etag"', None, {'Title': 'title'})
+        self.assertEqual(cache.get('https://example.org/docushare/dsweb/Services/Document-1'),
+                         ('"etag"', None, {'Title': 'title'}))
+
+    def test_persistent(self):
+        version_handles = [handle('Version-2'), handle('Version-1')]
+        cache = PageCache(self.tempdir)
+        cache.set('https://example.org/docushare/dsweb/ServicesLib/Document-1/History', None, 'Mon, 01 Aug 2022 00:00:00 GMT', version_handles)
+        cache.sync()
+        del cache
+
+        cache = PageCache(self.tempdir)
+        self.assertEqual(cache.get('https://example.org/docushare/dsweb/ServicesLib/Document-1/History'),
+                         (None, 'Mon, 01 Aug 2022 00:00:00 GMT', version_handles))
+        del cache
+
+    def test_close(self):
+        cache = PageCache(self.tempdir)
+        cache.set('https://example.org/docushare/dsweb/Services/Document-1', '"etag"', None, {'Title': 'title'})
+        cache.close()
+        # The closed cache is still usable in memory.
+        cache.set('https://example.org/docushare/dsweb/Services/Document-2', '"etag"', None, {'Title': 'title'})
+        self.assertIsNotNone(cache.get('https://example.org/docushare/dsweb/Services/Document-2'))
+        cache.close()
+
+        cache = PageCache(self.tempdir)
+        self.assertEqual(cache.get('https://example.org/docushare/dsweb/Services/Document-1'),
+                         ('"etag"', None, {'Title': 'title'}))
+        self.assertIsNone(cache.get('https://example.org/docushare/dsweb/Services/Document-2'))
+        cache.close()
+
+    def test_ttl(self):
+        cache = PageCache(ttl = 0)
+        cache.set('https://example.org/docushare/dsweb/Services/Document-1', None, None, {})
+        self.assertFalse(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+
+        # Move the clock forward rather than sleeping.
+        with mock.patch('docushare.cache.time.time', return_value = 1000.0) as clock:
+            cache = PageCache(ttl = 0.5)
+            self.assertFalse(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+            cache.set('https://example.org/docushare/dsweb/Services/Document-1', None, None, {})
+            self.assertTrue(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+            clock.return_value = 1000.4
+            self.assertTrue(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+            clock.return_value = 1000.6
+            self.assertFalse(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+            cache.refresh('https://example.org/docushare/dsweb/Services/Document-1')
+            self.assertTrue(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+            clock.return_value = 1001.2
+            self.assertFalse(cache.is_fresh('https://example.org/docushare/dsweb/Services/Document-1'))
+
+    def test_maxsize(self):
+        cache = PageCache(self.tempdir, maxsize = 2)
+        cache.set('https://example.org/docushare/dsweb/Services/Document-1', None, None, 1)
+        cache.set('https://example.org/docushare/dsweb/Services/Document-2', None, None, 2)
+        cache.get('https://example.org/docushare/dsweb/Services/Document-1')
+        cache.set('https://example.org/docushare/dsweb/Services/Document-3', None, None, 3)
+        self.assertIsNotNone(cache.get('https://example.org/docushare/dsweb/Services/Document-1'))
+        self.assertIsNone(cache.get('https://example.org/docushare/dsweb/Services/Document-2'))
+        self.assertIsNotNone(cache.get('https://example.org/docushare/dsweb/Services/Document-3'))
+        cache.sync()
+        del cache
+
+        cache = PageCache(self.tempdir, maxsize = 1)
+        self.assertIsNone(cache.get('https://example.org/docushare/dsweb/Services/Document-1'))
+        self.assertIsNone(cache.get('https://example.org/docushare/dsweb/Services/Document-2'))
+        self.assertEqual(cache.get('https://example.org/docushare/dsweb/Services/Document-3'), (None, None, 3))
+        del cache
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(TypeError):
+            PageCache(ttl = -1)
+        with self.assertRaises(TypeError):
+            PageCache(maxsize = 0)
+
+
+class DocuShareCacheTest(TestCase):
+    base_url = 'https://example.org/docushare/'
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+
+        # Mock the login and the DocuShare pages. The property page of Version-1 is the only page loaded.
+        patchers = [
+            mock.patch.object(DocuShare, '_DocuShare__open_and_parse_login_page',
+                              return_value = ('token', self.base_url + 'js/challenge.js')),
+            mock.patch.object(DocuShare, '_DocuShare__download_challenge_js', return_value = ''),
+            mock.patch.object(DocuShare, '_DocuShare__submit_credentials', autospec = True,
+                              side_effect = self.submit_credentials),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(DocuShare, 'http_get', autospec = True, side_effect = self.http_get)
+        self.http_get_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def submit_credentials(ds, username, password, login_token, challenge_js, domain):
+        ds.cookies.set('AmberUser', username)
+        return True, None
+
+    @staticmethod
+    def http_get(ds, url, headers = None, stream = False):
+        http_response = requests.Response()
+        http_response.status_code = 200
+        http_response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        http_response.headers['ETag'] = '"version-1"'
+        http_response.encoding = 'utf-8'
+        http_response._content = (
+            '<table class="propstable">'
+            '<tr><td>Title:</td><td><a href="/docushare/dsweb/Get/Version-1/a.pdf">Title</a></td></tr>'
+            '<tr><td>Version Number:</td><td>1</td></tr>'
+            '</table>').encode('utf-8')
+        return http_response
+
+    def load_version(self, ds, username):
+        if ds.username != username:
+            ds.login(username = username, password = 'password')
+        self.http_get_mock.reset_mock()
+        ds['Version-1']
+        return self.http_get_mock.call_count
+
+    def test_users_share_cache_dir(self):
+        ds = DocuShare(self.base_url, cache_dir = self.tempdir, cache_ttl = 60)
+        self.assertEqual(self.load_version(ds, 'alice'), 1)
+        ds.close()
+
+        # Another user never gets the fresh page parsed for alice without accessing the DocuShare site.
+        ds = DocuShare(self.base_url, cache_dir = self.tempdir, cache_ttl = 60)
+        self.assertEqual(self.load_version(ds, 'bob'), 1)
+        ds.close()
+
+        # alice still reuses her own fresh page.
+        ds = DocuShare(self.base_url, cache_dir = self.tempdir, cache_ttl = 60)
+        self.assertEqual(self.load_version(ds, 'alice'), 0)
+        ds.close()
+
+    def test_login_as_another_user(self):
+        ds = DocuShare(self.base_url, cache_dir = self.tempdir, cache_ttl = 60)
+        self.assertEqual(self.load_version(ds, 'alice'), 1)
+        self.assertEqual(self.load_version(ds, 'alice'), 0)
+        self.assertEqual(self.load_version(ds, 'bob'), 1)
+        ds.close()
@@ -1,44 +1,28 @@
 import os
 import pathlib
-import shutil
-import tempfile
-from unittest import TestCase, skipIf
+from concurrent.futures import ThreadPoolExecutor
 
 from docushare import *
 
+from environment import DocuShareTestCase
 
-class DocuShareTest(TestCase):
-    required_envs = [
+
+class DocuShareTest(DocuShareTestCase):
+    required_envs = (
         'DOCUSHARE_BASEURL',
         'DOCUSHARE_USERNAME',
         'DOCUSHARE_VALID_DOCUMENT_HANDLE',
         'DOCUSHARE_VALID_VERSION_HANDLE',
-    ]
-    skip = not all([env in os.environ for env in required_envs])
-    skip_reason = 'Following environmental variables are not defined: ' + ', '.join([env for env in required_envs if env not in os.environ])
+    )
     
-    def setUp(self):
-        self.base_url = os.environ['DOCUSHARE_BASEURL']
-        self.username = os.environ['DOCUSHARE_USERNAME']
-        self.valid_document_handle = os.environ['DOCUSHARE_VALID_DOCUMENT_HANDLE']
-        self.valid_version_handle = os.environ['DOCUSHARE_VALID_VERSION_HANDLE']
-
-        if 'DOCUSHARE_PASSWORD' in os.environ:
-            self.password = os.environ['DOCUSHARE_PASSWORD']
-        else:
-            self.password = PasswordOption.USE_STORED
-
-        self.ds = DocuShare(self.base_url)
-        self.ds.login(username = self.username, password = self.password)
-        self.tempdir = pathlib.Path(tempfile.mkdtemp())
-        
-    def tearDown(self):
-        self.ds.close()
-        shutil.rmtree(self.tempdir)
-        
-    @skipIf(skip, skip_reason)
-    def test_normal_workflow_1(self):
-        doc_obj = self.ds.object(self.valid_document_handle)
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.document_download_url = cls.base_url + 'dsweb/Get/' + cls.valid_document_handle
+        cls.version_download_url  = cls.base_url + 'dsweb/Get/' + cls.valid_version_handle
+
+    def assert_valid_document_object(self, doc_obj):
         self.assertIsInstance(doc_obj, DocumentObject)
         self.assertIsInstance(doc_obj, DocuShareBaseObject)
         self.assertEqual(doc_obj.docushare, self.ds)
@@ -49,30 +33,9 @@ class DocuShareTest(TestCase):
         self.assertIsInstance(doc_obj.title, str)
         self.assertIsInstance(doc_obj.filename, str)
         self.assertIsInstance(doc_obj.document_control_number, (str, type(None)))
-        self.assertEqual(doc_obj.download_url, self.base_url + 'dsweb/Get/' + self.valid_document_handle)
-
-        doc_obj_path1 = doc_obj.download(self.tempdir)
-        self.assertTrue(pathlib.Path(doc_obj_path1).is_file())
+        self.assertEqual(doc_obj.download_url, self.document_download_url)
 
-        doc_obj_path2 = doc_obj.download(self.tempdir.joinpath('document.bin'))
-        self.assertTrue(pathlib.Path(doc_obj_path2).is_file())
-
-        doc_obj_path3 = self.tempdir.joinpath('document.bin2')
-        self.ds.download(self.valid_document_handle, doc_obj_path3)
-        self.assertTrue(pathlib.Path(doc_obj_path3).is_file())
-       
-        doc_version_handles = doc_obj.version_handles
-        self.assertIsInstance(doc_version_handles, list)
-        self.assertTrue(len(doc_version_handles) > 0)
-        self.assertTrue(all([version_handle.type == HandleType.Version for version_handle in doc_version_handles]))
-
-        doc_versions = doc_obj.versions
-        self.assertIsInstance(doc_versions, list)
-        self.assertEqual(len(doc_versions), len(doc_version_handles))
-        self.assertTrue(all([isinstance(version, VersionObject) for version in doc_versions]))
-        self.assertTrue(all([(version.handle in doc_version_handles) for version in doc_versions]))
-
-        ver_obj = self.ds.object(self.valid_version_handle)
+    def assert_valid_version_object(self, ver_obj):
         self.assertIsInstance(ver_obj, VersionObject)
         self.assertIsInstance(ver_obj, DocuShareBaseObject)
         self.assertEqual(ver_obj.docushare, self.ds)
@@ -83,53 +46,96 @@ class DocuShareTest(TestCase):
         self.assertIsInstance(ver_obj.title, str)
         self.assertIsInstance(ver_obj.filename, str)
         self.assertIsInstance(ver_obj.version_number, int)
-        self.assertEqual(ver_obj.download_url, self.base_url + 'dsweb/Get/' + self.valid_version_handle)
+        self.assertEqual(ver_obj.download_url, self.version_download_url)
 
-        ver_obj_path1 = ver_obj.download(self.tempdir)
-        self.assertTrue(pathlib.Path(ver_obj_path1).is_file())
+    def test_normal_workflow_1(self):
+        doc_obj = self.ds.object(self.valid_document_handle)
+        self.assert_valid_document_object(doc_obj)
 
-        ver_obj_path2 = ver_obj.download(self.tempdir.joinpath('version.bin'))
-        self.assertTrue(pathlib.Path(ver_obj_path2).is_file())
+        doc_version_handles = doc_obj.version_handles
+        self.assertIsInstance(doc_version_handles, list)
+        self.assertTrue(len(doc_version_handles) > 0)
+        self.assertTrue(all(version_handle.type == HandleType.Version for version_handle in doc_version_handles))
 
+        doc_versions = doc_obj.versions
+        self.assertIsInstance(doc_versions, list)
+        self.assertEqual(len(doc_versions), len(doc_version_handles))
+        self.assertTrue(all(isinstance(version, VersionObject) for version in doc_versions))
+        self.assertTrue(all((version.handle in doc_version_handles) for version in doc_versions))
+
+        ver_obj = self.ds.object(self.valid_version_handle)
+        self.assert_valid_version_object(ver_obj)
+
+        # The downloads below are independent of each other. Run them concurrently. Those downloaded
+        # into a directory use separate directories not to write the same file at the same time.
+        doc_obj_dir1 = self.tempdir.joinpath('document1')
+        doc_obj_dir4 = self.tempdir.joinpath('document4')
+        ver_obj_dir1 = self.tempdir.joinpath('version1')
+        for download_dir in (doc_obj_dir1, doc_obj_dir4, ver_obj_dir1):
+            download_dir.mkdir()
+        doc_obj_path3 = self.tempdir.joinpath('document.bin2')
         ver_obj_path3 = self.tempdir.joinpath('version.bin2')
-        self.ds.download(self.valid_version_handle, ver_obj_path3)
-        self.assertTrue(pathlib.Path(ver_obj_path3).is_file())
 
-    @skipIf(skip, skip_reason)
+        with ThreadPoolExecutor(max_workers = 7) as executor:
+            doc_obj_path1_future = executor.submit(doc_obj.download, doc_obj_dir1)
+            doc_obj_path2_future = executor.submit(doc_obj.download, self.tempdir.joinpath('document.bin'))
+            doc_obj_path3_future = executor.submit(self.ds.download, self.valid_document_handle, doc_obj_path3)
+            doc_obj_path4_future = executor.submit(self.ds.download, self.valid_document_handle, doc_obj_dir4)
+            ver_obj_path1_future = executor.submit(ver_obj.download, ver_obj_dir1)
+            ver_obj_path2_future = executor.submit(ver_obj.download, self.tempdir.joinpath('version.bin'))
+            ver_obj_path3_future = executor.submit(self.ds.download, self.valid_version_handle, ver_obj_path3)
+
+        doc_obj_path1 = doc_obj_path1_future.result()
+        self.assertTrue(os.path.isfile(doc_obj_path1))
+
+        doc_obj_path2 = doc_obj_path2_future.result()
+        self.assertTrue(os.path.isfile(doc_obj_path2))
+
+        doc_obj_path3_future.result()
+        self.assertTrue(os.path.isfile(doc_obj_path3))
+
+        doc_obj_path4 = doc_obj_path4_future.result()
+        self.assertTrue(os.path.isfile(doc_obj_path4))
+        self.assertEqual(pathlib.Path(doc_obj_path4).parent, doc_obj_dir4)
+
+        ver_obj_path1 = ver_obj_path1_future.result()
+        self.assertTrue(os.path.isfile(ver_obj_path1))
+
+        ver_obj_path2 = ver_obj_path2_future.result()
+        self.assertTrue(os.path.isfile(ver_obj_path2))
+
+        ver_obj_path3_future.result()
+        self.assertTrue(os.path.isfile(ver_obj_path3))
+
+    def test_versions_from_history_page(self):
+        # The Version objects of a document are built from its history page. They must agree with the
+        # property pages of the versions.
+        doc_obj = self.ds[self.valid_document_handle]
+        for ver_obj in doc_obj.prefetch_versions():
+            with self.subTest(version_handle = ver_obj.handle):
+                properties = self.ds._DocuShare__load_properties(ver_obj.handle)
+                self.assertEqual(ver_obj.title, properties['Title'])
+                self.assertEqual(ver_obj.version_number, properties['Version Number'])
+                self.assertEqual(ver_obj.filename, properties['_filename'])
+
     def test_normal_workflow_2(self):
         doc_obj = self.ds[self.valid_document_handle]
-        self.assertIsInstance(doc_obj, DocumentObject)
-        self.assertIsInstance(doc_obj, DocuShareBaseObject)
-        self.assertEqual(doc_obj.docushare, self.ds)
-        self.assertEqual(doc_obj.handle.type, HandleType.Document)
-        self.assertIsInstance(doc_obj.handle.number, int)
-        self.assertTrue(doc_obj.handle.number >= 0)
-        self.assertEqual(doc_obj.handle.identifier, self.valid_document_handle)
-        self.assertIsInstance(doc_obj.title, str)
-        self.assertIsInstance(doc_obj.filename, str)
-        self.assertIsInstance(doc_obj.document_control_number, (str, type(None)))
-        self.assertEqual(doc_obj.download_url, self.base_url + 'dsweb/Get/' + self.valid_document_handle)
+        self.assert_valid_document_object(doc_obj)
 
         doc_version_handles = doc_obj.version_handles
         self.assertIsInstance(doc_version_handles, list)
         self.assertTrue(len(doc_version_handles) > 0)
-        self.assertTrue(all([version_handle.type == HandleType.Version for version_handle in doc_version_handles]))
+        self.assertTrue(all(version_handle.type == HandleType.Version for version_handle in doc_version_handles))
         
+        prefetched_versions = doc_obj.prefetch_versions()
+        self.assertEqual([version.handle for version in prefetched_versions], doc_version_handles)
+
         doc_versions = doc_obj.versions
         self.assertIsInstance(doc_versions, list)
         self.assertEqual(len(doc_versions), len(doc_version_handles))
-        self.assertTrue(all([isinstance(version, VersionObject) for version in doc_versions]))
-        self.assertTrue(all([(version.handle in doc_version_handles) for version in doc_versions]))
+        self.assertTrue(all(isinstance(version, VersionObject) for version in doc_versions))
+        self.assertTrue(all((version.handle in doc_version_handles) for version in doc_versions))
+        self.assertTrue(all((prefetched is version) for prefetched, version in zip(prefetched_versions, doc_versions)))
 
         ver_obj = self.ds[self.valid_version_handle]
-        self.assertIsInstance(ver_obj, VersionObject)
-        self.assertIsInstance(ver_obj, DocuShareBaseObject)
-        self.assertEqual(ver_obj.docushare, self.ds)
-        self.assertEqual(ver_obj.handle.type, HandleType.Version)
-        self.assertIsInstance(ver_obj.handle.number, int)
-        self.assertTrue(ver_obj.handle.number >= 0)
-        self.assertEqual(ver_obj.handle.identifier, self.valid_version_handle)
-        self.assertIsInstance(ver_obj.title, str)
-        self.assertIsInstance(ver_obj.filename, str)
-        self.assertIsInstance(ver_obj.version_number, int)
-        self.assertEqual(ver_obj.download_url, self.base_url + 'dsweb/Get/' + self.valid_version_handle)
+        self.assert_valid_version_object(ver_obj)
@@ -1,25 +1,21 @@
-import os
 from unittest import TestCase, skipIf
 
 from docushare import *
 
+from environment import envs, password, skip_condition
+
 
 class DocuShareLoginTest(TestCase):
-    required_envs = [
+    required_envs = (
         'DOCUSHARE_BASEURL',
         'DOCUSHARE_USERNAME',
-    ]
-    skip = not all([env in os.environ for env in required_envs])
-    skip_reason = 'Following environmental variables are not defined: ' + ', '.join([env for env in required_envs if env not in os.environ])
+    )
+    skip, skip_reason = skip_condition(required_envs)
 
     def setUp(self):
-        self.base_url = os.environ['DOCUSHARE_BASEURL']
-        self.username = os.environ['DOCUSHARE_USERNAME']
-
-        if 'DOCUSHARE_PASSWORD' in os.environ:
-            self.password = os.environ['DOCUSHARE_PASSWORD']
-        else:
-            self.password = PasswordOption.USE_STORED
+        self.base_url = envs()['DOCUSHARE_BASEURL']
+        self.username = envs()['DOCUSHARE_USERNAME']
+        self.password = password()
             
     @skipIf(skip, skip_reason)
     def test_login(self):
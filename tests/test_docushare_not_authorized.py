@@ -1,63 +1,47 @@
-import os
-import pathlib
-import shutil
-import tempfile
-from unittest import TestCase, skipIf
+from concurrent.futures import ThreadPoolExecutor
 
 from docushare import *
 
+from environment import DocuShareTestCase
 
-class DocuShareNotAuthorizedTest(TestCase):
-    required_envs = [
+
+class DocuShareNotAuthorizedTest(DocuShareTestCase):
+    required_envs = (
         'DOCUSHARE_BASEURL',
         'DOCUSHARE_USERNAME',
         'DOCUSHARE_NOT_AUTHORIZED_DOCUMENT_HANDLE',
         'DOCUSHARE_NOT_AUTHORIZED_VERSION_HANDLE',
-    ]
-    skip = not all([env in os.environ for env in required_envs])
-    skip_reason = 'Following environmental variables are not defined: ' + ', '.join([env for env in required_envs if env not in os.environ])
-
-    def setUp(self):
-        self.base_url = os.environ['DOCUSHARE_BASEURL']
-        self.username = os.environ['DOCUSHARE_USERNAME']
-        self.not_authorized_document_handle = os.environ['DOCUSHARE_NOT_AUTHORIZED_DOCUMENT_HANDLE']
-        self.not_authorized_version_handle  = os.environ['DOCUSHARE_NOT_AUTHORIZED_VERSION_HANDLE']
-
-        if 'DOCUSHARE_PASSWORD' in os.environ:
-            self.password = os.environ['DOCUSHARE_PASSWORD']
-        else:
-            self.password = PasswordOption.USE_STORED
-            
-        self.ds = DocuShare(self.base_url)
-        self.ds.login(username = self.username, password = self.password)
-        self.tempdir = pathlib.Path(tempfile.mkdtemp())
-            
-    def tearDown(self):
-        self.ds.close()
-        shutil.rmtree(self.tempdir)
-            
-    @skipIf(skip, skip_reason)
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.not_authorized_document_services_url = cls.base_url + 'dsweb/Services/' + cls.not_authorized_document_handle
+        cls.not_authorized_version_services_url  = cls.base_url + 'dsweb/Services/' + cls.not_authorized_version_handle
+
     def test_not_authorized_errors(self):
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.object(self.not_authorized_document_handle)
-
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds[self.not_authorized_document_handle]
-            
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.download(self.not_authorized_document_handle, self.tempdir.joinpath('test.bin'))
-            
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.http_get(self.base_url + 'dsweb/Services/' + self.not_authorized_document_handle)
-            
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.object(self.not_authorized_version_handle)
-
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds[self.not_authorized_version_handle]
-            
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.download(self.not_authorized_version_handle, self.tempdir.joinpath('test.bin'))
-
-        with self.assertRaises(DocuShareNotAuthorizedError) as context:
-            self.ds.http_get(self.base_url + 'dsweb/Services/' + self.not_authorized_version_handle)
+        cases = []
+        for hdl, services_url in ((self.not_authorized_document_handle, self.not_authorized_document_services_url),
+                                  (self.not_authorized_version_handle,  self.not_authorized_version_services_url)):
+            cases += [
+                (self.ds.object,      (hdl,)),
+                (self.ds.__getitem__, (hdl,)),
+                (self.ds.download,    (hdl, self.tempdir.joinpath('test.bin'))),
+                (self.ds.http_get,    (services_url,)),
+            ]
+
+        # The requests are independent of each other. Send them concurrently and check the results afterwards.
+        def call(method, args):
+            try:
+                method(*args)
+            except Exception as e:
+                return e
+            return None
+
+        with ThreadPoolExecutor(max_workers = len(cases)) as executor:
+            errors = list(executor.map(lambda case: call(*case), cases))
+
+        for (method, args), error in zip(cases, errors):
+            with self.subTest(method = method.__name__, args = args):
+                self.assertIsInstance(error, DocuShareNotAuthorizedError)
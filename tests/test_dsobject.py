@@ -0,0 +1,72 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from docushare import *
+from docushare.dsobject import _unique_download_infos
+
+
+class CollectionDownloadTest(TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.tempdir = Path(temporary_directory.name)
+
+        self.ds = DocuShare('https://example.org/docushare/')
+        self.filenames = {
+            handle('Document-1'): 'a.pdf',
+            handle('Document-2'): 'a.pdf',
+            handle('Document-3'): 'b.pdf',
+        }
+
+    def document_object(self, hdl):
+        return DocumentObject(self.ds, hdl, hdl.identifier, self.filenames[hdl], None, [])
+
+    def download(self, object_handles, max_workers):
+        collection = CollectionObject(self.ds, handle('Collection-1'), 'collection', object_handles)
+        prefetch = lambda hdls, max_workers: [self.document_object(hdl) for hdl in hdls]
+        with mock.patch.object(self.ds, 'prefetch', side_effect = prefetch), \
+             mock.patch.object(self.ds, 'download') as download:
+            paths = collection.download(self.tempdir, progress_report = False, max_workers = max_workers)
+        return paths, sorted((str(call.args[0]), call.args[1]) for call in download.call_args_list)
+
+    def test_colliding_paths(self):
+        # Document-1 appears twice (e.g. in two sub collections downloaded into one directory), and
+        # Document-2 has the same file name as Document-1.
+        object_handles = [handle('Document-1'), handle('Document-2'), handle('Document-1'), handle('Document-3')]
+
+        # The documents are downloaded one by one in order, as in the sequential downloads.
+        expected_downloads = [
+            ('Document-1', self.tempdir.joinpath('a.pdf')),
+            ('Document-1', self.tempdir.joinpath('a.pdf')),
+            ('Document-2', self.tempdir.joinpath('a.pdf')),
+            ('Document-3', self.tempdir.joinpath('b.pdf')),
+        ]
+        paths, downloads = self.download(object_handles, max_workers = 1)
+        self.assertEqual(downloads, expected_downloads)
+        self.assertEqual(sorted(paths), sorted(path for _, path in expected_downloads))
+
+        # The concurrent downloads never write the same file.
+        expected_downloads = [
+            ('Document-1', self.tempdir.joinpath('a.pdf')),
+            ('Document-2', self.tempdir.joinpath('a (Document-2).pdf')),
+            ('Document-3', self.tempdir.joinpath('b.pdf')),
+        ]
+        paths, downloads = self.download(object_handles, max_workers = 8)
+        self.assertEqual(downloads, expected_downloads)
+        self.assertEqual(sorted(paths), sorted(path for _, path in expected_downloads))
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(TypeError):
+            self.download([handle('Document-1')], max_workers = 2.0)
+        with self.assertRaises(ValueError):
+            self.download([handle('Document-1')], max_workers = 0)
+
+    def test_renamed_path_collision(self):
+        download_infos = [
+            (handle('Document-1'), self.tempdir.joinpath('a.pdf')),
+            (handle('Document-2'), self.tempdir.joinpath('a.pdf')),
+            (handle('Document-3'), self.tempdir.joinpath('a (Document-2).pdf')),
+        ]
+        with self.assertRaises(FileExistsError):
+            _unique_download_infos(download_infos)
@@ -1,24 +1,97 @@
 from unittest import TestCase
 
-from docushare import *
+from anytree import RenderTree
+
+from docushare import CollectionHandleNode, DocumentHandleNode, Handle, HandleType, InvalidHandleError, handle
+
+# Tuples of handle type, handle number and the expected identifier.
+INIT_CASES = (
+    (HandleType.Collection, 0,      'Collection-0'),
+    (HandleType.Collection, 12345,  'Collection-12345'),
+    (HandleType.Collection, 1234,   'Collection-1234'),
+    (HandleType.Collection, 99999,  'Collection-99999'),
+    (HandleType.Document,   0,      'Document-0'),
+    (HandleType.Document,   12345,  'Document-12345'),
+    (HandleType.Document,   1234,   'Document-1234'),
+    (HandleType.Document,   99999,  'Document-99999'),
+    (HandleType.Version,    0,      'Version-0'),
+    (HandleType.Version,    123456, 'Version-123456'),
+    (HandleType.Version,    1234,   'Version-1234'),
+    (HandleType.Version,    999999, 'Version-999999'),
+)
+
+# An object that is neither a str, an int, a HandleType nor a Handle.
+NOT_A_HANDLE = object()
+
+# Arguments of Handle constructor with a wrong type.
+INIT_WRONG_TYPE_CASES = (
+    ('Collection',          12345),
+    (12345,                 12345),
+    (None,                  12345),
+    (HandleType.Collection, '12345'),
+    (HandleType.Collection, NOT_A_HANDLE),
+    (HandleType.Collection, None),
+)
+
+# Values that are neither a handle string nor a Handle.
+WRONG_TYPE_VALUES = (None, 12345, NOT_A_HANDLE)
+
+# Tuples of a valid identifier and the expected handle type and number.
+FROM_STR_CASES = (
+    ('Collection-12345', HandleType.Collection, 12345),
+    ('Collection-0',     HandleType.Collection, 0),
+    ('Collection-99999', HandleType.Collection, 99999),
+    ('Document-12345',   HandleType.Document,   12345),
+    ('Document-0',       HandleType.Document,   0),
+    ('Document-99999',   HandleType.Document,   99999),
+    ('Version-123456',   HandleType.Version,    123456),
+    ('Version-0',        HandleType.Version,    0),
+    ('Version-999999',   HandleType.Version,    999999),
+)
+
+# Tuples of two (handle type, handle number) pairs and whether the two handles are expected to be
+# equal and have the same hash. If not, both the handles and their hashes must differ.
+COMPARISON_CASES = (
+    ((HandleType.Collection, 12345),  (HandleType.Collection, 12345),  True),
+    ((HandleType.Document,   99999),  (HandleType.Document,   99999),  True),
+    ((HandleType.Version,    111111), (HandleType.Version,    111111), True),
+
+    ((HandleType.Collection, 12345),  (HandleType.Collection, 54321),  False),
+    ((HandleType.Document,   99999),  (HandleType.Document,   11111),  False),
+    ((HandleType.Version,    111111), (HandleType.Version,    999999), False),
+
+    ((HandleType.Collection, 12345),  (HandleType.Document,   12345),  False),
+    ((HandleType.Collection, 12345),  (HandleType.Version,    12345),  False),
+    ((HandleType.Document,   99999),  (HandleType.Collection, 99999),  False),
+    ((HandleType.Document,   99999),  (HandleType.Version,    99999),  False),
+    ((HandleType.Version,    11111),  (HandleType.Collection, 11111),  False),
+    ((HandleType.Version,    11111),  (HandleType.Document,   11111),  False),
+)
+
+# Strings that are not valid identifiers.
+FROM_STR_INVALID_CASES = (
+    'Collection-a',
+    'Collection-0x01',
+    'Document-a',
+    'Document-0x01',
+    'Version-a',
+    'Version-0xff',
+    '',
+    'abc',
+    'Version123456',
+    'Version 123456',
+    'Version--123456',
+    'Version-xxxxxx',
+    '-123456',
+    'Hello-123456',
+)
 
 
 class HandleTest(TestCase):
-    def test_init_wrong_type_1(self):
-        with self.assertRaises(TypeError) as context:
-            Handle('Collection', 12345)
-        with self.assertRaises(TypeError) as context:
-            Handle(12345, 12345)
-        with self.assertRaises(TypeError) as context:
-            Handle(None, 12345)
-        
-    def test_init_wrong_type_2(self):
-        with self.assertRaises(TypeError) as context:
-            Handle(HandleType.Collection, '12345')
-        with self.assertRaises(TypeError) as context:
-            Handle(HandleType.Collection, object())
-        with self.assertRaises(TypeError) as context:
-            Handle(HandleType.Collection, None)
+    def test_init_wrong_type(self):
+        for args in INIT_WRONG_TYPE_CASES:
+            with self.subTest(args = args), self.assertRaises(TypeError):
+                Handle(*args)
             
     def test_init_negative_number(self):
         with self.assertRaises(ValueError) as context:
@@ -28,201 +101,40 @@ class HandleTest(TestCase):
         with self.assertRaises(ValueError) as context:
             Handle(HandleType.Version, -1)
             
-    def test_init_collection_0(self):
-        hdl = Handle(HandleType.Collection, 0)
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Collection-0')
-        
-    def test_init_collection_1(self):
-        hdl = Handle(HandleType.Collection, 12345)
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 12345)
-        self.assertEqual(hdl.identifier, 'Collection-12345')
-
-    def test_init_collection_2(self):
-        hdl = Handle(HandleType.Collection, 1234)
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 1234)
-        self.assertEqual(hdl.identifier, 'Collection-1234')
-
-    def test_init_collection_3(self):
-        hdl = Handle(HandleType.Collection, 99999)
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 99999)
-        self.assertEqual(hdl.identifier, 'Collection-99999')
-
-    def test_init_document_0(self):
-        hdl = Handle(HandleType.Document, 0)
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Document-0')
-
-    def test_init_document_1(self):
-        hdl = Handle(HandleType.Document, 12345)
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 12345)
-        self.assertEqual(hdl.identifier, 'Document-12345')
-
-    def test_init_document_2(self):
-        hdl = Handle(HandleType.Document, 1234)
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 1234)
-        self.assertEqual(hdl.identifier, 'Document-1234')
-        
-    def test_init_document_3(self):
-        hdl = Handle(HandleType.Document, 99999)
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 99999)
-        self.assertEqual(hdl.identifier, 'Document-99999')
-
-    def test_init_version_0(self):
-        hdl = Handle(HandleType.Version, 0)
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Version-0')
-        
-    def test_init_version_1(self):
-        hdl = Handle(HandleType.Version, 123456)
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 123456)
-        self.assertEqual(hdl.identifier, 'Version-123456')
-
-    def test_init_version_2(self):
-        hdl = Handle(HandleType.Version, 1234)
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 1234)
-        self.assertEqual(hdl.identifier, 'Version-1234')
-
-    def test_init_version_3(self):
-        hdl = Handle(HandleType.Version, 999999)
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 999999)
-        self.assertEqual(hdl.identifier, 'Version-999999')
-        
-    def test_from_str_collection_1(self):
-        hdl = Handle.from_str('Collection-12345')
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 12345)
-        self.assertEqual(hdl.identifier, 'Collection-12345')
-
-    def test_from_str_collection_2(self):
-        hdl = Handle.from_str('Collection-0')
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Collection-0')
-
-    def test_from_str_collection_3(self):
-        hdl = Handle.from_str('Collection-99999')
-        self.assertEqual(hdl.type, HandleType.Collection)
-        self.assertEqual(hdl.number, 99999)
-        self.assertEqual(hdl.identifier, 'Collection-99999')
-
-    def test_from_str_collection_4(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Collection-a')
-        
-    def test_from_str_collection_5(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Collection-0x01')
-
-    def test_from_str_document_1(self):
-        hdl = Handle.from_str('Document-12345')
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 12345)
-        self.assertEqual(hdl.identifier, 'Document-12345')
-
-    def test_from_str_document_2(self):
-        hdl = Handle.from_str('Document-0')
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Document-0')
-
-    def test_from_str_document_3(self):
-        hdl = Handle.from_str('Document-99999')
-        self.assertEqual(hdl.type, HandleType.Document)
-        self.assertEqual(hdl.number, 99999)
-        self.assertEqual(hdl.identifier, 'Document-99999')
-
-    def test_from_str_document_4(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Document-a')
-        
-    def test_from_str_document_5(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Document-0x01')
-            
-    def test_from_str_version_1(self):
-        hdl = Handle.from_str('Version-123456')
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 123456)
-        self.assertEqual(hdl.identifier, 'Version-123456')
-
-    def test_from_str_version_2(self):
-        hdl = Handle.from_str('Version-0')
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 0)
-        self.assertEqual(hdl.identifier, 'Version-0')
-
-    def test_from_str_version_3(self):
-        hdl = Handle.from_str('Version-999999')
-        self.assertEqual(hdl.type, HandleType.Version)
-        self.assertEqual(hdl.number, 999999)
-        self.assertEqual(hdl.identifier, 'Version-999999')
-
-    def test_from_str_version_4(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version-a')
-        
-    def test_from_str_version_5(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version-0xff')
-
-    def test_from_str_invalid_1(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('')
-
-    def test_from_str_invalid_2(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('abc')
-            
-    def test_from_str_invalid_3(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version123456')
-            
-    def test_from_str_invalid_4(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version 123456')
-            
-    def test_from_str_invalid_5(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version--123456')
-            
-    def test_from_str_invalid_6(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Version-xxxxxx')
-            
-    def test_from_str_invalid_7(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('-123456')
-            
-    def test_from_str_invalid_8(self):
-        with self.assertRaises(InvalidHandleError) as context:
-            hdl = Handle.from_str('Hello-123456')
-            
-    def test_from_str_wrong_type_1(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = Handle.from_str(None)
-            
-    def test_from_str_wrong_type_2(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = Handle.from_str(12345)
-
-    def test_from_str_wrong_type_3(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = Handle.from_str(object())
+    def test_init(self):
+        for handle_type, number, identifier in INIT_CASES:
+            with self.subTest(handle_type = handle_type, number = number):
+                hdl = Handle(handle_type, number)
+                self.assertEqual(hdl.type, handle_type)
+                self.assertEqual(hdl.number, number)
+                self.assertEqual(hdl.identifier, identifier)
+
+    def test_from_str(self):
+        for identifier, handle_type, number in FROM_STR_CASES:
+            with self.subTest(identifier = identifier):
+                hdl = Handle.from_str(identifier)
+                self.assertEqual(hdl.type, handle_type)
+                self.assertEqual(hdl.number, number)
+                self.assertEqual(hdl.identifier, identifier)
+
+    def test_from_str_invalid(self):
+        for identifier in FROM_STR_INVALID_CASES:
+            with self.subTest(identifier = identifier), self.assertRaises(InvalidHandleError):
+                Handle.from_str(identifier)
+
+    def test_from_str_wrong_type(self):
+        for value in WRONG_TYPE_VALUES:
+            with self.subTest(value = value), self.assertRaises(TypeError):
+                Handle.from_str(value)
             
 class HandleFunctionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Construct the handles compared in test_handle_equal_and_hash() once per (type, number) pair.
+        # The left and right sides are kept separate so that equal handles are distinct instances.
+        cls.left_handles  = {key: Handle(*key) for key, _, _ in COMPARISON_CASES}
+        cls.right_handles = {key: Handle(*key) for _, key, _ in COMPARISON_CASES}
+
     def test_handle_1(self):
         hdl = handle('Collection-12345')
         self.assertEqual(hdl.type, HandleType.Collection)
@@ -236,6 +148,20 @@ class HandleFunctionTest(TestCase):
         self.assertEqual(hdl.number, 12345)
         self.assertEqual(hdl.identifier, 'Collection-12345')
 
+    def test_handle_3(self):
+        hdl1 = handle('Document-12345')
+        hdl2 = handle('Document-12345')
+        self.assertIs(hdl1, hdl2)
+
+    def test_handle_4(self):
+        hdl1 = handle('Document-12345')
+        handle.cache_clear()
+        self.assertEqual(handle.cache_info().currsize, 0)
+        hdl2 = handle('Document-12345')
+        self.assertIsNot(hdl1, hdl2)
+        self.assertEqual(hdl1, hdl2)
+        self.assertEqual(handle.cache_info().currsize, 1)
+
     def test_handle_invalid_1(self):
         with self.assertRaises(InvalidHandleError) as context:
             hdl = handle('Collection-0x01')
@@ -244,46 +170,73 @@ class HandleFunctionTest(TestCase):
         with self.assertRaises(InvalidHandleError) as context:
             hdl = handle('')
             
-    def test_handle_wrong_type_1(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = handle(12345)
-            
-    def test_handle_wrong_type_2(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = handle(None)
-
-    def test_handle_wrong_type_3(self):
-        with self.assertRaises(TypeError) as context:
-            hdl = handle(object())
+    def test_handle_wrong_type(self):
+        for value in WRONG_TYPE_VALUES:
+            with self.subTest(value = value), self.assertRaises(TypeError):
+                handle(value)
             
-    def test_handle_equal(self):
-        self.assertEqual(Handle(HandleType.Collection, 12345), Handle(HandleType.Collection, 12345))
-        self.assertEqual(Handle(HandleType.Document, 99999), Handle(HandleType.Document, 99999))
-        self.assertEqual(Handle(HandleType.Version, 111111), Handle(HandleType.Version, 111111))
-
-        self.assertNotEqual(Handle(HandleType.Collection, 12345), Handle(HandleType.Collection, 54321))
-        self.assertNotEqual(Handle(HandleType.Document, 99999), Handle(HandleType.Document, 11111))
-        self.assertNotEqual(Handle(HandleType.Version, 111111), Handle(HandleType.Version, 999999))
-        
-        self.assertNotEqual(Handle(HandleType.Collection, 12345), Handle(HandleType.Document, 12345))
-        self.assertNotEqual(Handle(HandleType.Collection, 12345), Handle(HandleType.Version, 12345))
-        self.assertNotEqual(Handle(HandleType.Document, 99999), Handle(HandleType.Collection, 99999))
-        self.assertNotEqual(Handle(HandleType.Document, 99999), Handle(HandleType.Version, 99999))
-        self.assertNotEqual(Handle(HandleType.Version, 11111), Handle(HandleType.Collection, 11111))
-        self.assertNotEqual(Handle(HandleType.Version, 11111), Handle(HandleType.Document, 11111))
-
-    def test_handle_hash(self):
-        self.assertEqual(Handle(HandleType.Collection, 12345).__hash__(), Handle(HandleType.Collection, 12345).__hash__())
-        self.assertEqual(Handle(HandleType.Document, 99999).__hash__(), Handle(HandleType.Document, 99999).__hash__())
-        self.assertEqual(Handle(HandleType.Version, 111111).__hash__(), Handle(HandleType.Version, 111111).__hash__())
-
-        self.assertNotEqual(Handle(HandleType.Collection, 12345).__hash__(), Handle(HandleType.Collection, 54321).__hash__())
-        self.assertNotEqual(Handle(HandleType.Document, 99999).__hash__(), Handle(HandleType.Document, 11111).__hash__())
-        self.assertNotEqual(Handle(HandleType.Version, 111111).__hash__(), Handle(HandleType.Version, 999999).__hash__())
-        
-        self.assertNotEqual(Handle(HandleType.Collection, 12345).__hash__(), Handle(HandleType.Document, 12345).__hash__())
-        self.assertNotEqual(Handle(HandleType.Collection, 12345).__hash__(), Handle(HandleType.Version, 12345).__hash__())
-        self.assertNotEqual(Handle(HandleType.Document, 99999).__hash__(), Handle(HandleType.Collection, 99999).__hash__())
-        self.assertNotEqual(Handle(HandleType.Document, 99999).__hash__(), Handle(HandleType.Version, 99999).__hash__())
-        self.assertNotEqual(Handle(HandleType.Version, 11111).__hash__(), Handle(HandleType.Collection, 11111).__hash__())
-        self.assertNotEqual(Handle(HandleType.Version, 11111).__hash__(), Handle(HandleType.Document, 11111).__hash__())
+    def test_handle_equal_and_hash(self):
+        for key1, key2, equal in COMPARISON_CASES:
+            with self.subTest(handle1 = key1, handle2 = key2):
+                hdl1 = self.left_handles[key1]
+                hdl2 = self.right_handles[key2]
+                self.assertIsNot(hdl1, hdl2)
+                if equal:
+                    self.assertEqual(hdl1, hdl2)
+                    self.assertEqual(hdl1.__hash__(), hdl2.__hash__())
+                else:
+                    self.assertNotEqual(hdl1, hdl2)
+                    self.assertNotEqual(hdl1.__hash__(), hdl2.__hash__())
+
+class HandleNodeTest(TestCase):
+    def setUp(self):
+        # Collection-1
+        # ├── Document-2
+        # └── Collection-3
+        #     ├── Document-4
+        #     └── Document-5
+        self.document2    = DocumentHandleNode(2)
+        self.document4    = DocumentHandleNode(4)
+        self.document5    = DocumentHandleNode(5)
+        # A child that appears more than once is attached only once.
+        self.collection3  = CollectionHandleNode(3, [self.document4, self.document5, self.document4])
+        self.collection1  = CollectionHandleNode(1, [self.document2, self.collection3])
+
+    def test_parent_and_children(self):
+        self.assertIsNone(self.collection1.parent)
+        self.assertEqual(self.collection1.children, (self.document2, self.collection3))
+        self.assertIs(self.document2.parent, self.collection1)
+        self.assertIs(self.collection3.parent, self.collection1)
+        self.assertEqual(self.collection3.children, (self.document4, self.document5))
+        self.assertIs(self.document4.parent, self.collection3)
+        self.assertIs(self.document5.parent, self.collection3)
+
+    def test_path_and_leaves(self):
+        self.assertEqual(self.document5.path, (self.collection1, self.collection3, self.document5))
+        self.assertEqual(self.collection1.leaves, (self.document2, self.document4, self.document5))
+        self.assertEqual(self.collection1.descendants,
+                         (self.document2, self.collection3, self.document4, self.document5))
+
+    def test_render_tree(self):
+        self.assertEqual(RenderTree(self.collection1).by_attr('identifier'), '\n'.join([
+            'Collection-1',
+            '├── Document-2',
+            '└── Collection-3',
+            '    ├── Document-4',
+            '    └── Document-5',
+        ]))
+
+    def test_read_only(self):
+        with self.assertRaises(RuntimeError):
+            self.document2.parent = self.collection3
+        with self.assertRaises(RuntimeError):
+            self.document4.parent = None
+        self.assertIs(self.document2.parent, self.collection1)
+        self.assertEqual(self.collection3.children, (self.document4, self.document5))
+
+    def test_reattach(self):
+        # A child attached to another collection is moved to the new collection.
+        collection6 = CollectionHandleNode(6, [self.document2])
+        self.assertIs(self.document2.parent, collection6)
+        self.assertEqual(self.collection1.children, (self.collection3, ))
+        self.assertEqual(self.collection1.leaves, (self.document4, self.document5))
@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+import requests
+
+from docushare import HandleType, handle
+from docushare.parser import parse_content_disposition_filename, parse_history_page_versions, parse_property_page
+
+# Tuples of Content-Disposition header (None if missing) and the file name suggested by it.
+CONTENT_DISPOSITION_CASES = (
+    (None                                                                  , None),
+    ('attachment'                                                          , None),
+    ('attachment; filename="report.pdf"'                                   , 'report.pdf'),
+    ('attachment; filename=report.pdf'                                     , 'report.pdf'),
+    ('attachment; FILENAME = "annual report.pdf"'                          , 'annual report.pdf'),
+    ("attachment; filename*=UTF-8''%E5%A0%B1%E5%91%8A.pdf"                 , '\u5831\u544a.pdf'),
+    ("attachment; filename*=iso-8859-1'en'%A3%20rates.pdf"                 , '\u00a3 rates.pdf'),
+    ("attachment; filename=\"fallback.pdf\"; filename*=UTF-8''real.pdf"    , 'real.pdf'),
+    ('attachment; filename="../../etc/passwd"'                             , 'passwd'),
+    ('attachment; filename="/etc/passwd"'                                  , 'passwd'),
+    ('attachment; filename="C:\\Windows\\evil.exe"'                        , 'evil.exe'),
+    ("attachment; filename*=UTF-8''..%2F..%2Fevil.pdf"                     , 'evil.pdf'),
+    ('attachment; filename=".."'                                           , None),
+    ('attachment; filename="dir/.."'                                       , None),
+    ('attachment; filename="..\\.."'                                       , None),
+    ("attachment; filename*=UTF-8''%2E%2E"                                 , None),
+    ('attachment; filename="."'                                            , None),
+    ('attachment; filename=""'                                             , None),
+)
+
+# History page of Document-100 and the property pages of its versions.
+HISTORY_PAGE = '''
+<html><body>
+<div class="navigation"><a href="/docushare/dsweb/Get/Version-1/logo.png">Home</a></div>
+<table class="table_properties">
+  <thead><tr><th>Preferred</th><th>#</th><th>Title</th><th>Edited</th><th>Comments</th></tr></thead>
+  <tbody>
+    <tr>
+      <td><input type="radio" name="preferred" value="Version-202" checked="checked"/></td>
+      <td><a href="/docushare/dsweb/Get/Version-202/report%20v2.pdf">2</a></td>
+      <td><a href="/docushare/dsweb/Get/Version-202/report%20v2.pdf;jsessionid=0123ABCD">Annual Report</a></td>
+      <td>08/01/22 10:00</td>
+      <td>Fixed typos</td>
+    </tr>
+    <tr>
+      <td><input type="radio" name="preferred" value="Version-201"/></td>
+      <td><a href="/docushare/dsweb/Get/Version-201/report.pdf">1</a></td>
+      <td><a href="/docushare/dsweb/Get/Version-201/report.pdf">Annual Report (draft)</a></td>
+      <td>07/01/22 10:00</td>
+      <td></td>
+    </tr>
+  </tbody>
+</table>
+</body></html>
+'''
+
+VERSION_PROPERTY_PAGES = {
+    'Version-202': '''
+<html><body>
+<table class="propstable">
+  <tr><td class="propname">Title:</td><td><a href="/docushare/dsweb/Get/Version-202/report%20v2.pdf">Annual Report</a></td></tr>
+  <tr><td class="propname">Handle:</td><td>Version-202</td></tr>
+  <tr><td class="propname">Version Number:</td><td>2</td></tr>
+  <tr><td class="propname">Comments:</td><td>Fixed typos</td></tr>
+</table>
+</body></html>
+''',
+    'Version-201': '''
+<html><body>
+<table class="propstable">
+  <tr><td class="propname">Title:</td><td><a href="/docushare/dsweb/Get/Version-201/report.pdf">Annual Report (draft)</a></td></tr>
+  <tr><td class="propname">Handle:</td><td>Version-201</td></tr>
+  <tr><td class="propname">Version Number:</td><td>1</td></tr>
+</table>
+</body></html>
+''',
+}
+
+
+class ContentDispositionFilenameTest(TestCase):
+    def test_content_disposition_filename(self):
+        for content_disposition, filename in CONTENT_DISPOSITION_CASES:
+            with self.subTest(content_disposition = content_disposition):
+                http_response = requests.Response()
+                if content_disposition is not None:
+                    http_response.headers['Content-Disposition'] = content_disposition
+                self.assertEqual(parse_content_disposition_filename(http_response), filename)
+
+
+class HistoryPageTest(TestCase):
+    def test_versions_agree_with_property_pages(self):
+        versions = parse_history_page_versions(HISTORY_PAGE)
+        self.assertEqual([version_handle for version_handle, _ in versions],
+                         [handle('Version-202'), handle('Version-201')])
+        # VersionObject is built from the history page instead of the property page of each version.
+        # Both pages must give the same title, version number and file name.
+        for version_handle, properties in versions:
+            with self.subTest(version_handle = version_handle):
+                version_properties = parse_property_page(VERSION_PROPERTY_PAGES[version_handle.identifier], HandleType.Version)
+                for name in ('Title', 'Version Number', '_filename'):
+                    self.assertEqual(properties[name], version_properties[name])